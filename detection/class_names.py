@@ -0,0 +1,6 @@
+# COCO class names, indexed by the detector's label ids; kept apart from vehicle_detector so
+# users of the names do not have to import torch
+CLASS_NAMES = [
+    'background', 'person', 'bicycle', 'car', 'motorcycle',
+    'airplane', 'bus', 'train', 'truck', 'boat'
+]
@@ -0,0 +1,171 @@
+"""
+Detector worker process for Smart Parking Management System
+Runs VehicleDetector in its own process so inference is not limited by the UI's GIL
+"""
+
+import math
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from detection.class_names import CLASS_NAMES
+
+# Largest frame that fits in the shared buffer (height, width, channels)
+MAX_FRAME_SHAPE = (1080, 1920, 3)
+
+
+def detector_worker(shm_name, frame_shape, frame_scale, frame_ready, result_q, stop_event, confidence_threshold,
+                    use_trt=False):
+    """
+    Worker process loop: wait for a frame in shared memory, run detection and
+    push the detections back through the result queue
+
+    Args:
+        shm_name: Name of the SharedMemory block holding two frame slots
+        frame_shape: multiprocessing.Array with the (slot, h, w, c) of the current frame
+        frame_scale: multiprocessing.Value with the factor the frame was shrunk by to fit its slot
+        frame_ready: Event set by the UI process once a frame has been written
+        result_q: Queue receiving one list of detections per processed frame
+        stop_event: Event that ends the loop
+        confidence_threshold: Confidence threshold for VehicleDetector
+        use_trt: Run the detector through ONNX Runtime/TensorRT
+    """
+    # Only the worker loads torch; the UI process never imports it for ML detection
+    from detection.vehicle_detector import VehicleDetector
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slot_size = shm.size // 2
+    try:
+        detector = VehicleDetector(confidence_threshold=confidence_threshold, use_trt=use_trt)
+        while not stop_event.is_set():
+            if not frame_ready.wait(timeout=0.1):
+                continue
+
+            # Read the frame in place: the UI process writes the next one into the other slot
+            slot, *shape = frame_shape[:]
+            scale = frame_scale.value
+            frame = np.ndarray(tuple(shape), dtype=np.uint8, buffer=shm.buf, offset=slot * slot_size)
+            frame_ready.clear()
+
+            detections = detector.detect_vehicles(frame)
+            del frame  # Release the buffer export so the block can be closed
+
+            # Map boxes of a downscaled frame back to the caller's frame
+            if scale != 1.0:
+                detections = [(int(x1 / scale), int(y1 / scale), int(x2 / scale), int(y2 / scale), score, label)
+                              for x1, y1, x2, y2, score, label in detections]
+            try:
+                result_q.put_nowait(detections)
+            except queue.Full:
+                pass  # UI is behind; it only needs the latest result anyway
+    finally:
+        shm.close()
+
+
+class DetectorProcess:
+    """
+    Asynchronous stand-in for VehicleDetector backed by a worker process
+
+    detect_vehicles() hands the frame to the worker when it is idle and returns the
+    most recent detections the worker has produced, so the caller never blocks on
+    inference. Results may therefore lag the displayed frame by one detection.
+
+    The shared block holds two frame slots used alternately. A new frame is only written
+    once the worker has picked up the previous one, which means it has finished with the
+    slot before that, so the worker can run inference straight out of shared memory.
+    Frames larger than a slot are shrunk into it, and the worker scales the boxes back.
+
+    The worker process, and with it the detection model, is only started by start(), so
+    construct this up front and start it when ML detection is first enabled.
+    """
+
+    def __init__(self, confidence_threshold=0.5, max_frame_shape=MAX_FRAME_SHAPE, use_trt=False):
+        """
+        Args:
+            confidence_threshold: Confidence threshold passed to the worker's VehicleDetector
+            max_frame_shape: Largest (h, w, c) frame each shared slot can hold
+            use_trt: Run the worker's detector through ONNX Runtime/TensorRT
+        """
+        self.classes = list(CLASS_NAMES)
+        self.confidence_threshold = confidence_threshold
+        self._latest = []
+
+        self._slot_size = int(np.prod(max_frame_shape))
+        self._slot = 0  # Slot the next frame is written to
+        self._shm = shared_memory.SharedMemory(create=True, size=2 * self._slot_size)
+        self._frame_shape = mp.Array('i', 4)
+        self._frame_scale = mp.Value('d', 1.0, lock=False)
+        self._frame_ready = mp.Event()
+        self._stop_event = mp.Event()
+        self._result_q = mp.Queue(maxsize=4)
+        self._process = mp.Process(
+            target=detector_worker,
+            args=(self._shm.name, self._frame_shape, self._frame_scale, self._frame_ready, self._result_q,
+                  self._stop_event, confidence_threshold, use_trt),
+            daemon=True)
+
+    def start(self):
+        """Start the worker process unless it has already been started"""
+        if self._process.pid is None:
+            self._process.start()
+        return self
+
+    @property
+    def exitcode(self):
+        """Exit code of the worker process, or None while it is running or not yet started"""
+        return self._process.exitcode
+
+    @property
+    def crashed(self):
+        """True once the worker has exited without being stopped, e.g. because the model failed to load"""
+        return self.exitcode is not None and not self._stop_event.is_set()
+
+    def detect_vehicles(self, frame):
+        """Submit frame if the worker is idle and return the latest available detections"""
+        if self.crashed:
+            # Nothing would ever clear frame_ready again, so stale results would be returned forever
+            raise RuntimeError(f"Detector process exited with code {self.exitcode}")
+
+        if not self._frame_ready.is_set():
+            shape, scale = frame.shape, 1.0
+            if frame.nbytes > self._slot_size:
+                # e.g. a 4K source: shrink it into the slot rather than skipping detection
+                scale = math.sqrt(self._slot_size / frame.nbytes)
+                shape = (max(1, int(frame.shape[0] * scale)), max(1, int(frame.shape[1] * scale))) + frame.shape[2:]
+                scale = min(shape[0] / frame.shape[0], shape[1] / frame.shape[1])
+
+            shared = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf,
+                                offset=self._slot * self._slot_size)
+            if scale == 1.0:
+                shared[...] = frame
+            else:
+                cv2.resize(frame, (shape[1], shape[0]), dst=shared, interpolation=cv2.INTER_AREA)
+            del shared  # Release the buffer export so the block can be closed later
+            self._frame_shape[:] = [self._slot, *shape]
+            self._frame_scale.value = scale
+            self._frame_ready.set()
+            self._slot ^= 1
+
+        while True:
+            try:
+                self._latest = self._result_q.get_nowait()
+            except queue.Empty:
+                break
+
+        return self._latest
+
+    def stop(self):
+        """Stop the worker process and release the shared buffer; safe to call more than once"""
+        if self._shm is None:
+            return
+        self._stop_event.set()
+        if self._process.is_alive():
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
@@ -2,45 +2,225 @@ import cv2
 import numpy as np
 import cvzone
 
+from utils.buffer_pool import MatPool
 
-def process_parking_frame(frame, gpu_adaptive_threshold, cv_gpu_available=False):
-    """Process frame for parking detection"""
-    imgGray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    imgBlur = cv2.GaussianBlur(imgGray, (3, 3), 1)
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
-    # Use GPU accelerated threshold if available
-    imgThreshold = gpu_adaptive_threshold(
-        imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 25, 16, cv_gpu_available)
+# Structuring element for the dilation after the median filter, allocated once instead of per frame
+_KERNEL3 = np.ones((3, 3), np.uint8)
 
-    imgMedian = cv2.medianBlur(imgThreshold, 5)
-    kernel = np.ones((3, 3), np.uint8)
-    imgDilate = cv2.dilate(imgMedian, kernel, iterations=1)
+# Intermediate grayscale images of the host pipeline, reused across frames
+_POOL = MatPool()
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _count_slots(thresh, xs, ys, ws, hs, out):
+        """Count non-zero pixels of every space, one space per thread"""
+        for i in prange(xs.size):
+            s = 0
+            for y in range(ys[i], ys[i] + hs[i]):
+                for x in range(xs[i], xs[i] + ws[i]):
+                    if thresh[y, x]:
+                        s += 1
+            out[i] = s
+else:
+    _count_slots = None
+
+
+def warm_up_slot_counter():
+    """Compile the Numba slot counter ahead of the first frame (no-op without Numba)"""
+    if _count_slots is not None:
+        one = np.ones(1, np.int32)
+        _count_slots(np.zeros((1080, 1920), np.uint8), one, one, one, one, np.empty(1, np.int32))
+
+
+class ParkingRenderer:
+    """Pre-render the parking space ID labels, which only change when the spaces do"""
+
+    def __init__(self):
+        self._key = None
+        self._overlay = None
+        self._mask = None
+
+    def draw_ids(self, img, ids, xs, ys):
+        """Copy the cached ID labels onto img, rebuilding them if the layout changed"""
+        key = (img.shape, ids.tobytes(), xs.tobytes(), ys.tobytes())
+        if key != self._key:
+            self._overlay = np.zeros_like(img)
+            for i, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist()):
+                cv2.putText(self._overlay, str(i), (x + 5, y + 15),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+            self._mask = self._overlay.any(axis=2, keepdims=True)
+            self._key = key
+
+        np.copyto(img, self._overlay, where=self._mask)
 
-    return imgDilate
 
+class SlotLayout:
+    """
+    Per-space geometry derived from parking_xywh for one frame size
+
+    Built once whenever the spaces or the frame size change, so each frame only needs
+    one integral image and a single gather of four corner values per space.
+    """
+
+    def __init__(self, parking_xywh, frame_shape):
+        parking_xywh = np.asarray(parking_xywh, dtype=np.int32).reshape(-1, 4)
+        self.shape = tuple(frame_shape[:2])
+        xs, ys, ws, hs = parking_xywh.T
 
-def check_parking_space(processed_img, img, parking_positions, threshold):
-    """Check parking spaces in the processed image"""
-    space_counter = 0
-    for i, (x, y, w, h) in enumerate(parking_positions):
         # Ensure coordinates are within image bounds
-        if (y >= 0 and y + h < processed_img.shape[0] and
-                x >= 0 and x + w < processed_img.shape[1]):
+        valid = ((ys >= 0) & (ys + hs < self.shape[0]) &
+                 (xs >= 0) & (xs + ws < self.shape[1]))
+        self.ids = np.flatnonzero(valid)
+        self.xs, self.ys, self.ws, self.hs = xs[self.ids], ys[self.ids], ws[self.ids], hs[self.ids]
+        xs, ys, ws, hs = self.xs, self.ys, self.ws, self.hs
 
-            # Draw ID number for each space
-            cv2.putText(img, str(i), (x + 5, y + 15),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+        # Flat indices of the bottom-right, top-right, bottom-left and top-left corners
+        # of every space in the (H + 1, W + 1) integral image
+        stride = self.shape[1] + 1
+        self.corner_idx = np.stack([(ys + hs) * stride + xs + ws, ys * stride + xs + ws,
+                                    (ys + hs) * stride + xs, ys * stride + xs]).astype(np.intp)
+
+        # Outline polygons for cv2.polylines
+        self.corners = np.stack([np.stack([xs, ys], axis=1),
+                                 np.stack([xs + ws, ys], axis=1),
+                                 np.stack([xs + ws, ys + hs], axis=1),
+                                 np.stack([xs, ys + hs], axis=1)], axis=1)
+
+    def count(self, processed_img):
+        """Non-zero pixel count of every in-bounds space"""
+        if _count_slots is not None:
+            # Reads only the pixels inside spaces, in parallel, without building an integral image
+            counts = np.empty(self.ids.size, np.int32)
+            _count_slots(processed_img, self.xs, self.ys, self.ws, self.hs, counts)
+            return counts
+
+        # processed_img is a 0/255 mask, so integrate it directly and divide by 255 rather
+        # than spending a full-frame pass (and allocation) converting it to 0/1 first
+        integral = cv2.integral(processed_img).ravel()
+        br, tr, bl, tl = integral[self.corner_idx]
+        return (br - tr - bl + tl) // 255
+
+
+def process_parking_frame(frame):
+    """Process frame for parking detection
+
+    frame may be a NumPy array or a cv2.cuda_GpuMat. Host frames always stay on the
+    CPU side: a per-call upload/download to CUDA and NPP launch overhead usually
+    make cv2.cuda slower than the CPU for this small chain. The CUDA pipeline is
+    only used when the caller already holds the frame on the GPU (e.g. from a CUDA
+    video decoder), so there is nothing to upload.
 
-            imgCrop = processed_img[y:y + h, x:x + w]
-            count = cv2.countNonZero(imgCrop)
+    When OpenCL is enabled the host chain runs on a cv2.UMat so OpenCV's transparent
+    API keeps it on the OpenCL device; the result is only copied back to host memory
+    once at the end. Without OpenCL the plain arrays skip the UMat wrapping and the
+    intermediates are written into pooled buffers.
+    """
+    gpu_mat_type = getattr(cv2, 'cuda_GpuMat', None)
+    if gpu_mat_type is not None and isinstance(frame, gpu_mat_type):
+        return _process_parking_frame_cuda(frame)
 
-            if count < threshold:
-                color = (0, 255, 0)  # Green for free
-                space_counter += 1
-            else:
-                color = (0, 0, 255)  # Red for occupied
+    if cv2.ocl.useOpenCL():
+        src = cv2.UMat(frame)
+        imgGray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+        imgBlur = cv2.GaussianBlur(imgGray, (3, 3), 1)
+        imgThreshold = cv2.adaptiveThreshold(
+            imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 25, 16)
+        imgMedian = cv2.medianBlur(imgThreshold, 5)
+        return cv2.dilate(imgMedian, _KERNEL3).get()
+
+    # Host path: every intermediate goes into a pooled buffer; only the returned mask is allocated
+    shape = frame.shape[:2]
+    imgGray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=_POOL.get(shape))
+    imgBlur = cv2.GaussianBlur(imgGray, (3, 3), 1, dst=_POOL.get(shape))
+    imgThreshold = cv2.adaptiveThreshold(
+        imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 25, 16, dst=imgGray)
+
+    # The median removes speckle noise and the dilation thickens the remaining edges; the
+    # occupancy threshold is calibrated against exactly this pair, so keep them as they are
+    imgMedian = cv2.medianBlur(imgThreshold, 5, dst=imgBlur)
+    imgDilate = cv2.dilate(imgMedian, _KERNEL3)
+    _POOL.put(imgGray, imgBlur)
+    return imgDilate
+
+
+_cuda_filters = None
+
+
+def _get_cuda_filters():
+    """Create the CUDA filters once; building them is far more expensive than applying them"""
+    global _cuda_filters
+    if _cuda_filters is None:
+        _cuda_filters = (
+            cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (3, 3), 1),
+            # adaptiveThreshold pads with BORDER_REPLICATE, not the filters' reflect-101 default
+            cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (25, 25), 0,
+                                          rowBorderMode=cv2.BORDER_REPLICATE,
+                                          columnBorderMode=cv2.BORDER_REPLICATE),
+            cv2.cuda.createMedianFilter(cv2.CV_8UC1, 5),
+            cv2.cuda.createMorphologyFilter(cv2.MORPH_DILATE, cv2.CV_8UC1, _KERNEL3),
+        )
+    return _cuda_filters
+
+
+def _process_parking_frame_cuda(gpu_frame):
+    """GPU version of process_parking_frame for frames already resident in a GpuMat"""
+    blur_filter, mean_filter, median_filter, dilate_filter = _get_cuda_filters()
+
+    gpuGray = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGR2GRAY)
+    gpuBlur = blur_filter.apply(gpuGray)
+
+    # cv2.cuda has no adaptiveThreshold: Gaussian-weighted local mean, then
+    # THRESH_BINARY_INV with C=16 keeps pixels where mean - src >= 16
+    gpuMean = mean_filter.apply(gpuBlur)
+    gpuDiff = cv2.cuda.subtract(gpuMean, gpuBlur)
+    _, gpuThreshold = cv2.cuda.threshold(gpuDiff, 15, 255, cv2.THRESH_BINARY)
+
+    gpuMedian = median_filter.apply(gpuThreshold)
+    gpuDilate = dilate_filter.apply(gpuMedian)
+    return gpuDilate.download()
+
+
+def check_parking_space(processed_img, img, parking_xywh, threshold, renderer=None):
+    """Check parking spaces in the processed image
+
+    parking_xywh is a SlotLayout built for this frame size, or an (N, 4) int32 array of
+    (x, y, w, h) / list of positions from which a layout is built on each call. Pass a
+    ParkingRenderer to reuse pre-rendered ID labels.
+    """
+    if isinstance(parking_xywh, SlotLayout):
+        layout = parking_xywh
+    else:
+        layout = SlotLayout(parking_xywh, processed_img.shape)
+    ids, xs, ys, hs = layout.ids, layout.xs, layout.ys, layout.hs
+    if ids.size == 0:
+        return img, 0
+
+    # Non-zero pixel count of every space from four lookups into the integral image
+    counts = layout.count(processed_img)
+    free_mask = counts < threshold
+    space_counter = int(free_mask.sum())
+
+    # Draw all free (green) and all occupied (red) outlines in one call per color
+    for mask, color in ((free_mask, (0, 255, 0)), (~free_mask, (0, 0, 255))):
+        if mask.any():
+            cv2.polylines(img, list(layout.corners[mask]), True, color, 2)
+
+    # Draw ID number for each space
+    if renderer is not None:
+        renderer.draw_ids(img, ids, xs, ys)
+    else:
+        for i, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist()):
+            cv2.putText(img, str(i), (x + 5, y + 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
 
-            cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
-            cvzone.putTextRect(img, str(count), (x, y + h - 3), scale=1, thickness=2, offset=0)
+    # Draw the pixel count for each space
+    for x, y, h, count in zip(xs.tolist(), ys.tolist(), hs.tolist(), counts.tolist()):
+        cvzone.putTextRect(img, str(count), (x, y + h - 3), scale=1, thickness=2, offset=0)
 
-    return img, space_counter
\ No newline at end of file
+    return img, space_counter
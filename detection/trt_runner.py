@@ -0,0 +1,83 @@
+"""
+ONNX Runtime / TensorRT backend for VehicleDetector
+Exports the torchvision detector to ONNX once and runs it through ONNX Runtime,
+preferring the TensorRT execution provider at FP16 when it is installed
+"""
+
+import os
+
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+def export_onnx(model, onnx_path, input_size, device):
+    """
+    Export a torchvision detection model for a fixed input_size x input_size image
+
+    Args:
+        model: Detection model in eval mode
+        onnx_path: Output .onnx file
+        input_size: Side of the letterboxed input image
+        device: Device the model lives on
+    """
+    os.makedirs(os.path.dirname(onnx_path) or '.', exist_ok=True)
+    dummy = [torch.zeros((3, input_size, input_size), device=device)]
+    with torch.no_grad():
+        torch.onnx.export(model, (dummy,), onnx_path, opset_version=17,
+                          input_names=['image'], output_names=['boxes', 'labels', 'scores'])
+
+
+class TRTRunner:
+    """
+    Drop-in replacement for a torchvision detection model backed by ONNX Runtime
+
+    Called with a list of CHW float tensors, it returns a list of dicts with 'boxes',
+    'labels' and 'scores' on the input device, like the torch model in eval mode.
+    """
+
+    def __init__(self, model, onnx_path, input_size, device):
+        """
+        Args:
+            model: Detection model to export if onnx_path does not exist yet
+            onnx_path: Cached .onnx file; TensorRT engines are cached next to it
+            input_size: Side of the letterboxed input image
+            device: Device the returned tensors are placed on
+        """
+        if ort is None:
+            raise ImportError("onnxruntime is not installed")
+
+        if not os.path.exists(onnx_path):
+            export_onnx(model, onnx_path, input_size, device)
+
+        available = ort.get_available_providers()
+        providers = []
+        if 'TensorrtExecutionProvider' in available:
+            providers.append(('TensorrtExecutionProvider', {
+                'trt_fp16_enable': True,
+                'trt_engine_cache_enable': True,
+                'trt_engine_cache_path': os.path.dirname(onnx_path) or '.',
+            }))
+        if 'CUDAExecutionProvider' in available:
+            providers.append('CUDAExecutionProvider')
+        providers.append('CPUExecutionProvider')
+
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.providers = self.session.get_providers()
+        self.input_name = self.session.get_inputs()[0].name
+        self.device = device
+
+    def __call__(self, images):
+        # The exported graph takes one image, so a batch is run image by image
+        predictions = []
+        for image in images:
+            boxes, labels, scores = self.session.run(None, {self.input_name: image.float().cpu().numpy()})
+            predictions.append({
+                'boxes': torch.from_numpy(boxes).to(self.device),
+                'labels': torch.from_numpy(labels).to(self.device),
+                'scores': torch.from_numpy(scores).to(self.device),
+            })
+        return predictions
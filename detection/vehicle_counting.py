@@ -2,24 +2,48 @@ import cv2
 import numpy as np
 import cvzone
 
+from utils.buffer_pool import MatPool
+
+# Scratch buffers reused across frames by detect_vehicles_traditional
+_POOL = MatPool()
+
 def get_centroid(x, y, w, h):
     """Calculate centroid of a rectangle"""
     return x + w // 2, y + h // 2
 
-def detect_vehicles_traditional(frame1, frame2, min_contour_width, min_contour_height, line_height, offset, matches, vehicle_counter):
-    """Process frames to detect and count vehicles using traditional computer vision"""
-    # Get difference between frames
-    d = cv2.absdiff(frame1, frame2)
-    grey = cv2.cvtColor(d, cv2.COLOR_BGR2GRAY)
+# Closing kernel applied at half resolution (about 5x5 at full resolution)
+_CLOSE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+def create_background_subtractor(history=500, var_threshold=16):
+    """Create the stateful background model used by detect_vehicles_traditional"""
+    return cv2.createBackgroundSubtractorMOG2(history, var_threshold, False)
+
+def detect_vehicles_traditional(frame1, bg_subtractor, min_contour_width, min_contour_height, line_height, offset, matches, vehicle_counter, downscale=2):
+    """Process frames to detect and count vehicles using traditional computer vision
 
-    blur = cv2.GaussianBlur(grey, (5, 5), 0)
+    Detection runs on a copy shrunk by `downscale`; boxes are scaled back before drawing.
+    """
+    small = frame1
+    if downscale > 1:
+        small_h, small_w = frame1.shape[0] // downscale, frame1.shape[1] // downscale
+        small = cv2.resize(frame1, (small_w, small_h), dst=_POOL.get((small_h, small_w, 3)),
+                           interpolation=cv2.INTER_AREA)
 
-    _, th = cv2.threshold(blur, 20, 255, cv2.THRESH_BINARY)
-    dilated = cv2.dilate(th, np.ones((3, 3)))
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2, 2))
+    # Foreground mask from the background model (no shadow detection, so it is already binary)
+    fg = bg_subtractor.apply(small, fgmask=_POOL.get(small.shape[:2]))
 
-    closing = cv2.morphologyEx(dilated, cv2.MORPH_CLOSE, kernel)
-    contours, _ = cv2.findContours(closing, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    closing = cv2.morphologyEx(fg, cv2.MORPH_CLOSE, _CLOSE_KERNEL, dst=_POOL.get(small.shape[:2]))
+
+    # Bounding boxes and centroids of all blobs in one native call (label 0 is the background)
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(closing, connectivity=8, ltype=cv2.CV_32S)
+    _POOL.put(fg, closing)
+    if small is not frame1:
+        _POOL.put(small)
+    stats, centroids = stats[1:], centroids[1:]
+    valid = ((stats[:, cv2.CC_STAT_WIDTH] >= min_contour_width / downscale) &
+             (stats[:, cv2.CC_STAT_HEIGHT] >= min_contour_height / downscale))
+    boxes = (stats[valid, :4] * downscale).tolist()
+    centroids = (centroids[valid] * downscale).astype(int).tolist()
 
     # Draw detection line
     line_y = line_height
@@ -27,18 +51,12 @@ def detect_vehicles_traditional(frame1, frame2, min_contour_width, min_contour_h
         line_y = frame1.shape[0] - 50
     cv2.line(frame1, (0, line_y), (frame1.shape[1], line_y), (0, 255, 0), 2)
 
-    # Process contours
+    # Process blobs large enough to be vehicles
     new_matches = matches.copy()
-    for (i, c) in enumerate(contours):
-        (x, y, w, h) = cv2.boundingRect(c)
-        contour_valid = (w >= min_contour_width) and (h >= min_contour_height)
-
-        if not contour_valid:
-            continue
-
+    for (x, y, w, h), (cx, cy) in zip(boxes, centroids):
         cv2.rectangle(frame1, (x - 10, y - 10), (x + w + 10, y + h + 10), (255, 0, 0), 2)
 
-        centroid = get_centroid(x, y, w, h)
+        centroid = (cx, cy)
         new_matches.append(centroid)
         cv2.circle(frame1, centroid, 5, (0, 255, 0), -1)
 
@@ -93,15 +111,22 @@ def detect_vehicles_ml(frame, ml_detector, matches, vehicle_counter, line_height
 
         # Count vehicles crossing the line
         new_counter = vehicle_counter
+        seen = set(matches)
         for centroid in current_centroids:
             if (line_y - offset) < centroid[1] < (line_y + offset):
-                if centroid not in matches:
+                if centroid not in seen:
                     new_counter += 1
                     matches.append(centroid)
-
-        # Clean up old centroids
-        new_matches = [match for match in matches
-                      if any(np.linalg.norm(np.array(match) - np.array(c)) < 50 for c in current_centroids)]
+                    seen.add(centroid)
+
+        # Clean up old centroids (keep those within 50px of any current detection)
+        new_matches = []
+        if matches and current_centroids:
+            tracked = np.asarray(matches, dtype=np.int32)
+            current = np.asarray(current_centroids, dtype=np.int32)
+            dist_sq = ((tracked[:, None, :] - current[None, :, :]) ** 2).sum(axis=-1)
+            keep = (dist_sq < 50 ** 2).any(axis=1)
+            new_matches = [match for match, k in zip(matches, keep.tolist()) if k]
 
         # Display count
         cvzone.putTextRect(frame, f"Vehicle Count: {new_counter}", (10, 30),
@@ -1,24 +1,30 @@
+import os
+
 import cv2
-import pickle
-import cvzone
 import numpy as np
-import os
-import threading
-import time
 import torch
 from torchvision.models import detection
-from tkinter import Toplevel
-from datetime import datetime
-from tkinter import Tk, Label, Button, Frame, Canvas, Text, Scrollbar, OptionMenu, StringVar, IntVar, BooleanVar, messagebox, ttk, BOTH, \
-    TOP, LEFT, RIGHT, BOTTOM, X, Y, VERTICAL, HORIZONTAL
-from PIL import Image, ImageTk
+
+from detection.class_names import CLASS_NAMES
+from detection.trt_runner import TRTRunner
+
 
 class VehicleDetector:
-    def __init__(self, confidence_threshold=0.5):
+    def __init__(self, confidence_threshold=0.5, use_trt=False):
+        """
+        Args:
+            confidence_threshold: Minimum score for a detection to be kept
+            use_trt: Run inference through ONNX Runtime (TensorRT FP16 when available) instead of torch
+        """
         self.confidence_threshold = confidence_threshold
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.use_amp = self.device.type == 'cuda'  # FP16 autocast only helps on CUDA
         print(f"Using device: {self.device}")
 
+        # Inputs are letterboxed to a fixed size, so let cuDNN pick the fastest kernels once
+        if self.device.type == 'cuda':
+            torch.backends.cudnn.benchmark = True
+
         # Track memory usage
         if torch.cuda.is_available():
             torch.cuda.empty_cache()  # Clear cache first
@@ -28,6 +34,7 @@ class VehicleDetector:
             # Load pre-trained model with updated API
             from torchvision.models.detection import FasterRCNN_ResNet50_FPN_Weights
             self.model = detection.fasterrcnn_resnet50_fpn(weights=FasterRCNN_ResNet50_FPN_Weights.DEFAULT)
+            self.model.requires_grad_(False)
             self.model.to(self.device)
             self.model.eval()
 
@@ -41,57 +48,216 @@ class VehicleDetector:
             print(f"Error loading model: {e}")
             raise
 
-        # COCO class names
-        self.classes = [
-            'background', 'person', 'bicycle', 'car', 'motorcycle',
-            'airplane', 'bus', 'train', 'truck', 'boat'
-        ]
+        self.classes = list(CLASS_NAMES)
         self.vehicle_classes = [2, 3, 5, 6, 7, 8]  # Indices of vehicle classes
+        self.vehicle_class_tensor = torch.tensor(self.vehicle_classes, device=self.device)
 
         # Use smaller input size for inference (keeps aspect ratio)
+        # Frames are letterboxed to a fixed max_size x max_size so shapes stay static for torch.compile
         self.max_size = 480  # Lower this for more speed, raise for more accuracy
 
-        # Warm up the model
-        if torch.cuda.is_available():
+        # Make the model's internal GeneralizedRCNNTransform keep this size; by default it
+        # rescales every input to 800px before the backbone
+        self.model.transform.min_size = (self.max_size,)
+        self.model.transform.max_size = self.max_size
+
+        # Optionally export to ONNX and run through ONNX Runtime/TensorRT; torch remains the fallback
+        self.trt_runner = None
+        if use_trt:
+            onnx_path = os.path.join('models', f'fasterrcnn_resnet50_{self.max_size}.onnx')
+            try:
+                self.trt_runner = TRTRunner(self.model, onnx_path, self.max_size, self.device)
+                print(f"Using ONNX Runtime providers: {self.trt_runner.providers}")
+            except Exception as e:
+                print(f"TensorRT/ONNX setup failed: {str(e)}, using torch")
+
+        # Pinned host staging buffer and a dedicated copy stream for asynchronous H2D transfers
+        self.staging = None
+        self.h2d_stream = None
+        if self.device.type == 'cuda':
+            self.staging = torch.empty((1, self.max_size, self.max_size, 3), dtype=torch.uint8, pin_memory=True)
+            self.h2d_stream = torch.cuda.Stream()
+
+        # Compile the model into fused, cached graphs (PyTorch 2.x only). torch.compile is lazy,
+        # so compilation actually happens, and can fail, during the warm-up below
+        self.compiled = False
+        eager_model = self.model
+        if self.device.type == 'cuda' and self.trt_runner is None and hasattr(torch, 'compile'):
+            try:
+                self.model = torch.compile(self.model, mode='reduce-overhead', dynamic=False)
+                self.compiled = True
+            except Exception as e:
+                print(f"torch.compile failed: {str(e)}, using eager mode")
+
+        # Warm up the model (compiled models need a couple of passes to finish compiling)
+        if torch.cuda.is_available() and self.trt_runner is None:
             dummy_input = torch.zeros((1, 3, self.max_size, self.max_size), device=self.device)
             try:
-                with torch.no_grad():
-                    _ = self.model(dummy_input)
+                with torch.inference_mode(), torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp):
+                    for _ in range(2 if self.compiled else 1):
+                        _ = self.model(dummy_input)
+                if self.compiled:
+                    print("Model compiled with torch.compile")
                 print("Model warm-up completed")
             except Exception as e:
-                print(f"Model warm-up failed: {str(e)}, continuing anyway")
+                if not self.compiled:
+                    print(f"Model warm-up failed: {str(e)}, continuing anyway")
+                else:
+                    # The compiled module would fail the same way on every frame; go back to eager
+                    print(f"torch.compile failed during warm-up: {str(e)}, using eager mode")
+                    self.model = eager_model
+                    self.compiled = False
+
+        # Capture the single-frame backbone pass into a CUDA graph (torch.compile's reduce-overhead mode already does this)
+        self.cuda_graph = None
+        self.static_input = None
+        self.static_features = None
+        if self.device.type == 'cuda' and self.trt_runner is None and not self.compiled:
+            self._capture_cuda_graph()
+
+    def _capture_cuda_graph(self):
+        """Record the backbone forward pass on a static input buffer, falling back to eager mode on failure
+
+        Only the backbone + FPN is captured: the RPN and RoI heads produce data-dependent shapes
+        (top-k proposals, NMS) and synchronize with the host, which a CUDA graph cannot record.
+        """
+        try:
+            # The letterboxed frame comes out of the model's transform at a fixed, padded size
+            images, _ = self.model.transform([torch.zeros((3, self.max_size, self.max_size), device=self.device)])
+            static_input = torch.zeros_like(images.tensors)
+
+            # Warm up on a side stream so capture starts from a settled allocator state. The autocast
+            # weight cache must stay off: casts cached during capture would point at freed buffers on replay
+            side_stream = torch.cuda.Stream()
+            side_stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(side_stream), torch.inference_mode(), \
+                    torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp, cache_enabled=False):
+                for _ in range(3):
+                    self.model.backbone(static_input)
+            torch.cuda.current_stream().wait_stream(side_stream)
+
+            graph = torch.cuda.CUDAGraph()
+            with torch.inference_mode(), \
+                    torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp, cache_enabled=False), \
+                    torch.cuda.graph(graph):
+                static_features = self.model.backbone(static_input)
+
+            self.cuda_graph = graph
+            self.static_input = static_input
+            self.static_features = static_features
+            print("CUDA graph captured for the backbone")
+        except Exception as e:
+            print(f"CUDA graph capture failed: {str(e)}, using eager mode")
+
+    def _forward_with_graph(self, imgs):
+        """GeneralizedRCNN forward with the backbone replayed from the captured graph"""
+        model = self.model
+        original_sizes = [img.shape[-2:] for img in imgs]
+        images, _ = model.transform(imgs)
+        if images.tensors.shape != self.static_input.shape:
+            return model(imgs)
+
+        # Features are read by the heads before the next replay overwrites them
+        self.static_input.copy_(images.tensors)
+        self.cuda_graph.replay()
+        features = self.static_features
+
+        proposals, _ = model.rpn(images, features)
+        detections, _ = model.roi_heads(features, proposals, images.image_sizes)
+        return model.transform.postprocess(detections, images.image_sizes, original_sizes)
 
     def detect_vehicles(self, frame):
-        orig_h, orig_w = frame.shape[:2]
+        return self.detect_vehicles_batch([frame])[0]
 
-        # Resize to target size while maintaining aspect ratio
-        scale = min(self.max_size / orig_h, self.max_size / orig_w)
-        if scale < 1.0:
-            new_h, new_w = int(orig_h * scale), int(orig_w * scale)
-            frame = cv2.resize(frame, (new_w, new_h))
+    @torch.inference_mode()
+    def detect_vehicles_batch(self, frames):
+        """Run a single forward pass over a list of frames, returning detections per frame"""
+        resized = []
+        scales = []
+        for frame in frames:
+            orig_h, orig_w = frame.shape[:2]
 
-        # Convert frame to tensor
-        img = torch.from_numpy(frame.transpose(2, 0, 1)).float().div(255.0).unsqueeze(0)
-        img = img.to(self.device)
+            # Resize to target size while maintaining aspect ratio
+            scale = min(self.max_size / orig_h, self.max_size / orig_w)
+            if scale < 1.0:
+                new_h, new_w = int(orig_h * scale), int(orig_w * scale)
+                frame = cv2.resize(frame, (new_w, new_h))
 
-        with torch.no_grad():
-            predictions = self.model(img)
+            resized.append(frame)
+            scales.append(scale)
 
-        # Extract detections
-        boxes = predictions[0]['boxes'].cpu().numpy().astype(int)
-        scores = predictions[0]['scores'].cpu().numpy()
-        labels = predictions[0]['labels'].cpu().numpy()
+        imgs = self._to_device(resized)
 
-        # Filter by confidence and vehicle classes
-        vehicle_detections = []
-        for box, score, label in zip(boxes, scores, labels):
-            if score > self.confidence_threshold and label in self.vehicle_classes:
-                x1, y1, x2, y2 = box
+        if self.trt_runner is not None:
+            predictions = self.trt_runner(imgs)
+        elif self.cuda_graph is not None and len(imgs) == 1:
+            # Same autocast settings as the capture, so the eager heads see the same dtypes
+            with torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp, cache_enabled=False):
+                predictions = self._forward_with_graph(imgs)
+        else:
+            with torch.autocast('cuda', dtype=torch.float16, enabled=self.use_amp):
+                predictions = self.model(imgs)
 
-                # Scale back to original size if resized
-                if scale < 1.0:
-                    x1, y1, x2, y2 = int(x1 / scale), int(y1 / scale), int(x2 / scale), int(y2 / scale)
+        return [self._filter_predictions(prediction, scale)
+                for prediction, scale in zip(predictions, scales)]
 
-                vehicle_detections.append((x1, y1, x2, y2, score, label))
+    def _to_device(self, frames):
+        """Letterbox resized HWC uint8 frames and convert them to normalized CHW float tensors on the device
+
+        Frames are letterboxed into a fixed-size canvas; padding at the bottom/right keeps box
+        coordinates unchanged. On CUDA the canvas is the pinned staging buffer itself, so each
+        frame is copied once on the host before the asynchronous upload.
+        """
+        if self.h2d_stream is None:
+            return [torch.from_numpy(self._letterbox(frame).transpose(2, 0, 1)).float().div_(255.0)
+                    for frame in frames]
+
+        # Grow the pinned staging buffer if this batch is larger than any seen before
+        if self.staging.shape[0] < len(frames):
+            self.staging = torch.empty((len(frames), self.max_size, self.max_size, 3),
+                                       dtype=torch.uint8, pin_memory=True)
+        staging = self.staging[:len(frames)]
+        staging_np = staging.numpy()
+        for i, frame in enumerate(frames):
+            h, w = min(frame.shape[0], self.max_size), min(frame.shape[1], self.max_size)
+            staging_np[i, :h, :w] = frame[:h, :w]
+            staging_np[i, h:] = 0
+            staging_np[i, :h, w:] = 0
+
+        # Upload raw uint8 HWC (a quarter of the float32 bytes) on the side stream and
+        # do the CHW permute and normalization there, then make the compute stream wait for it
+        with torch.cuda.stream(self.h2d_stream):
+            batch = staging.to(self.device, non_blocking=True)
+            batch = batch.permute(0, 3, 1, 2).float().div_(255.0)
+        torch.cuda.current_stream().wait_stream(self.h2d_stream)
+        batch.record_stream(torch.cuda.current_stream())
+        return list(batch)
+
+    def _letterbox(self, frame):
+        """Pad a resized frame to max_size x max_size"""
+        h, w = frame.shape[:2]
+        if h == self.max_size and w == self.max_size:
+            return frame
+        padded = np.zeros((self.max_size, self.max_size, 3), dtype=frame.dtype)
+        padded[:min(h, self.max_size), :min(w, self.max_size)] = frame[:self.max_size, :self.max_size]
+        return padded
+
+    def _filter_predictions(self, prediction, scale):
+        """Keep confident vehicle detections and map boxes back to the original frame size"""
+        boxes = prediction['boxes']
+        scores = prediction['scores']
+        labels = prediction['labels']
+
+        # Filter by confidence and vehicle classes on the device, then copy only the survivors
+        keep = (scores > self.confidence_threshold) & torch.isin(labels, self.vehicle_class_tensor)
+        boxes = boxes[keep].float().cpu().numpy()
+        scores = scores[keep].float().cpu().numpy()
+        labels = labels[keep].cpu().numpy()
+
+        # Scale back to original size if resized
+        if scale < 1.0:
+            boxes = boxes / scale
+        boxes = boxes.astype(int)
 
-        return vehicle_detections
+        return [(x1, y1, x2, y2, score, label)
+                for (x1, y1, x2, y2), score, label in zip(boxes.tolist(), scores.tolist(), labels.tolist())]
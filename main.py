@@ -4,27 +4,49 @@ Smart Parking Management System
 Main entry point for the application
 """
 
+import logging
 import os
 import sys
 from tkinter import Tk
 
+import cv2
+
+# Let the PyTorch caching allocator grow segments in place instead of fragmenting;
+# must be set before CUDA is initialized (the detector process inherits it)
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
 # Add modules to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import the main application class
 from parking_management import ParkingManagementSystem
+from detection.detector_process import DetectorProcess
 
 
 def main():
     """Main entry point for the application"""
+    # Keep the GPU/OpenCL startup report from utils.gpu_utils on the console
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Let cvtColor/resize spread across cores, leaving one for the Tk thread
+    cv2.setNumThreads(max(1, (os.cpu_count() or 1) - 1))
+    cv2.setUseOptimized(True)
+
+    # The ML detector runs in its own process so inference does not compete with the UI for the GIL;
+    # the process (and the model) is only started the first time ML detection is enabled
+    detector = DetectorProcess(confidence_threshold=ParkingManagementSystem.DEFAULT_CONFIDENCE)
+
     # Create the main Tkinter root window
     root = Tk()
 
     # Initialize the application
-    app = ParkingManagementSystem(root)
+    app = ParkingManagementSystem(root, ml_detector=detector)
 
     # Start the Tkinter event loop
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        detector.stop()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
 # Main application class
 import cv2
 import pickle
+from collections import deque
 import numpy as np
 import os
+import queue
+import sys
 import threading
 import time
-import torch
 from datetime import datetime
 from tkinter import Tk, Label, Button, Frame, Canvas, Text, Scrollbar, OptionMenu, StringVar, IntVar, BooleanVar, \
     messagebox, ttk, BOTH, \
@@ -13,12 +15,14 @@ from tkinter import Tk, Label, Button, Frame, Canvas, Text, Scrollbar, OptionMen
 from PIL import Image, ImageTk
 
 # Import our modules
-from utils.gpu_utils import check_gpu_availability, gpu_adaptive_threshold, gpu_resize, diagnose_gpu
+from utils.gpu_utils import check_gpu_availability, get_cv_gpu_state, gpu_adaptive_threshold, gpu_resize, \
+    diagnose_gpu, warm_gpu_pool, enable_opencl
 from utils.file_utils import ensure_directories_exist, load_parking_positions, save_parking_positions, save_log, \
-    export_statistics
-from detection.vehicle_detector import VehicleDetector
-from detection.parking_detection import process_parking_frame, check_parking_space
-from detection.vehicle_counting import detect_vehicles_traditional, detect_vehicles_ml, get_centroid
+    export_statistics, load_image_cached, flush_writes
+from detection.parking_detection import process_parking_frame, check_parking_space, ParkingRenderer, SlotLayout, \
+    warm_up_slot_counter
+from detection.vehicle_counting import detect_vehicles_traditional, detect_vehicles_ml, get_centroid, \
+    create_background_subtractor
 
 # Import UI modules
 from ui.detection_tab import DetectionTab
@@ -34,8 +38,9 @@ class ParkingManagementSystem:
     MIN_CONTOUR_SIZE = 40
     DEFAULT_OFFSET = 10
     DEFAULT_LINE_HEIGHT = 400
+    MAX_STATS_ROWS = 100_000
 
-    def __init__(self, master):
+    def __init__(self, master, ml_detector=None):
         self.master = master
         self.master.title("Smart Parking Management System")
         self.master.geometry("1280x720")
@@ -43,36 +48,46 @@ class ParkingManagementSystem:
 
         # Initialize class variables
         self.running = False
-        self.posList = []
+        self._pos = np.zeros((16, 4), dtype=np.int32)  # Parking spaces as (x, y, w, h) rows; first _n are used
+        self._n = 0
+        self.slot_layout = None  # SlotLayout for parking_xywh at the current frame size
+        self.parking_renderer = ParkingRenderer()
+        self._ref_rgb_buf = None  # RGB copy of the reference image, reused while its size is unchanged
+        self._ref_pil = None
+        self._ref_tk = None
+        self._ref_state_version = 0  # Bumped on save; (reference, version) keys what has been loaded
+        self._positions_state = None  # Key of the positions currently held in memory
+        self._canvas_state = None  # Key of the reference currently drawn on the setup canvas
+        self._slot_items = []  # Setup canvas rectangle item for each parking space
         self.video_capture = None
         self.current_video = None
         self.vehicle_counter = 0
         self.matches = []  # For vehicle counting
-        self.line_height = 400  # Default line height for vehicle detection
-        self.min_contour_width = 40
-        self.min_contour_height = 40
-        self.offset = 10
-        self.parking_threshold = 500  # Default threshold for parking space detection
+        self.bg_subtractor = None  # Background model for traditional vehicle counting
+        self.line_height = self.DEFAULT_LINE_HEIGHT  # Line height for vehicle detection
+        self.min_contour_width = self.MIN_CONTOUR_SIZE
+        self.min_contour_height = self.MIN_CONTOUR_SIZE
+        self.offset = self.DEFAULT_OFFSET
+        self.parking_threshold = self.DEFAULT_THRESHOLD  # Threshold for parking space detection
         self.detection_mode = "parking"  # Default detection mode
         self.log_data = []  # For logging events
+        self._log_q = queue.Queue(maxsize=10000)  # (timestamp, message) pairs waiting for the UI thread
+        self.stats_data = deque(maxlen=self.MAX_STATS_ROWS)  # Oldest rows are dropped once full
 
         # ML detection settings
         self.use_ml_detection = False
-        self.ml_detector = None
+        self.ml_detector = ml_detector  # VehicleDetector or DetectorProcess
         self.ml_confidence = self.DEFAULT_CONFIDENCE
-        self.parking_threshold = self.DEFAULT_THRESHOLD
-        self.min_contour_width = self.MIN_CONTOUR_SIZE
-        self.min_contour_height = self.MIN_CONTOUR_SIZE
-        self.offset = self.DEFAULT_OFFSET
-        self.line_height = self.DEFAULT_LINE_HEIGHT
 
         # Thread safety
         self._cleanup_lock = threading.Lock()
         self.data_lock = threading.Lock()
         self.video_lock = threading.Lock()
 
-        # GPU availability
-        self.torch_gpu_available, self.cv_gpu_available = check_gpu_availability()
+        # GPU availability: OpenCV's is needed right away, PyTorch's is probed with the report below
+        self.cv_gpu_available = get_cv_gpu_state()
+        self.torch_gpu_available = False
+        self.opencl_available = enable_opencl()
 
         # Video reference map and dimensions
         self.video_reference_map = {
@@ -93,6 +108,8 @@ class ParkingManagementSystem:
             "newRefImage2.png": (1920, 1080)
         }
         self.current_reference_image = "carParkImg.png"  # Default
+        warm_gpu_pool(self.reference_dimensions[self.current_reference_image], self.cv_gpu_available)
+        warm_up_slot_counter()
 
         # Load resources
         self.config_dir = "config"
@@ -102,13 +119,13 @@ class ParkingManagementSystem:
 
         # Setup UI components
         self.setup_ui()
+        self.master.after(100, self._drain_log)
 
-        # Start a monitoring thread to log data
-        self.monitor_thread = threading.Thread(target=self.monitoring_thread, daemon=True)
-        self.monitor_thread.start()
+        # Record statistics every hour on the Tk event loop
+        self._monitor_job = self.master.after(3_600_000, self._monitor_tick)
 
-        # Diagnose GPU
-        self.diagnose_gpu()
+        # Probing PyTorch means importing it, which takes seconds; report the GPU without holding up the UI
+        threading.Thread(target=self._report_gpu, name="gpu-report", daemon=True).start()
 
     def ensure_directories_exist(self):
         """Ensure necessary directories exist"""
@@ -124,20 +141,78 @@ class ParkingManagementSystem:
                 self.video_capture.release()
             if hasattr(self, 'ml_detector') and self.ml_detector:
                 del self.ml_detector
-            torch.cuda.empty_cache()
 
     def load_parking_positions(self, reference_image=None):
         if reference_image is None:
             reference_image = self.current_reference_image
 
+        # Keep the in-memory spaces (and any unsaved edits) unless the reference changed or was saved
+        state = (reference_image, self._ref_state_version)
+        if state == self._positions_state:
+            return
+        self._positions_state = state
+
         positions = load_parking_positions(self.config_dir, reference_image, self.log_event)
         self.posList = positions
 
         # Update counters
-        self.total_spaces = len(self.posList)
+        self.total_spaces = len(self.parking_xywh)
         self.free_spaces = 0
         self.occupied_spaces = self.total_spaces
 
+    @property
+    def parking_xywh(self):
+        """(N, 4) int32 array of parking spaces; a view, so copy it before keeping it"""
+        return self._pos[:self._n]
+
+    @property
+    def posList(self):
+        """Parking spaces as a list of [x, y, w, h] lists, built on each access"""
+        return self.parking_xywh.tolist()
+
+    @posList.setter
+    def posList(self, positions):
+        positions = np.asarray(positions, dtype=np.int32).reshape(-1, 4)
+        self._pos = np.zeros((max(16, len(positions)), 4), dtype=np.int32)
+        self._pos[:len(positions)] = positions
+        self._n = len(positions)
+        self.slot_layout = None
+
+        # The drawn rectangles belong to the old spaces: redraw them now and the reference on next load
+        self._canvas_state = None
+        self._redraw_slots()
+
+    def _redraw_slots(self):
+        """Recreate the setup canvas rectangles so _slot_items lines up with the spaces again"""
+        if not hasattr(self, 'setup_tab_controller'):
+            self._slot_items = []
+            return
+        canvas = self.setup_tab_controller.setup_canvas
+        canvas.delete("slot")
+        self._slot_items = [canvas.create_rectangle(x, y, x + w, y + h, outline='green', width=2, tags="slot")
+                            for x, y, w, h in self.parking_xywh.tolist()]
+
+    def add_slot(self, x, y, w, h):
+        """Append a parking space, doubling the backing array when it is full"""
+        if self._n == len(self._pos):
+            grown = np.zeros((2 * len(self._pos), 4), dtype=np.int32)
+            grown[:self._n] = self._pos[:self._n]
+            self._pos = grown
+        self._pos[self._n] = (x, y, w, h)
+        self._n += 1
+        self.slot_layout = None
+
+    def remove_slot(self, index):
+        """Remove the parking space at index, keeping the order of the rest"""
+        self._pos[index:self._n - 1] = self._pos[index + 1:self._n]
+        self._n -= 1
+        self.slot_layout = None
+
+    def clear_slots(self):
+        """Remove all parking spaces"""
+        self._n = 0
+        self.slot_layout = None
+
     def setup_ui(self):
         """Set up the application's user interface"""
         # Create main container
@@ -165,15 +240,16 @@ class ParkingManagementSystem:
         self.reference_tab_controller = ReferenceTab(self.reference_tab, self)
 
         # Initialize status attributes
-        self.total_spaces = len(self.posList)
+        self.total_spaces = len(self.parking_xywh)
         self.free_spaces = 0
         self.occupied_spaces = self.total_spaces
         self.status_info = self.detection_tab_controller.status_info
 
         # Initialize video processing attributes
         self.frame_count = 0
-        self.frame_skip = 3
-        self.frame_processing_thread = None
+        self.dropped_per_frame = 0.0  # Smoothed number of source frames dropped per processed frame
+        self.capture_fps = 0.0  # Source frame rate; 0 for live sources, which never skip
+        self.processing_time = 0.0  # Smoothed per-frame processing time in seconds
 
     # The rest of the methods would be implemented here, but for clarity
     # only a subset are shown in this example. Each method would be moved
@@ -190,44 +266,110 @@ class ParkingManagementSystem:
             # Update the status info label
             self.detection_tab_controller.status_info.config(text=status_text)
 
+    def process_parking_frame(self, frame):
+        """Detect free parking spaces in a frame, returning the annotated frame (safe off the UI thread)"""
+        processed = process_parking_frame(frame)
+        if self.slot_layout is None or self.slot_layout.shape != processed.shape[:2]:
+            self.slot_layout = SlotLayout(self.parking_xywh, processed.shape)
+        frame, self.free_spaces = check_parking_space(
+            processed, frame, self.slot_layout, self.parking_threshold, self.parking_renderer)
+        self.occupied_spaces = self.total_spaces - self.free_spaces
+        return frame
+
+    def process_counting_frame(self, frame):
+        """Detect and count vehicles in a frame, returning the annotated frame (safe off the UI thread)"""
+        if self.use_ml_detection and getattr(self.ml_detector, 'crashed', False):
+            self.log_event(f"ML detector process exited with code {self.ml_detector.exitcode}; "
+                           f"falling back to traditional counting")
+            self.use_ml_detection = False
+
+        if self.use_ml_detection and self.ml_detector:
+            frame, self.matches, self.vehicle_counter = detect_vehicles_ml(
+                frame, self.ml_detector, self.matches, self.vehicle_counter, self.line_height, self.offset)
+        else:
+            if self.bg_subtractor is None:
+                self.bg_subtractor = create_background_subtractor()
+            frame, self.matches, self.vehicle_counter = detect_vehicles_traditional(
+                frame, self.bg_subtractor, self.min_contour_width, self.min_contour_height,
+                self.line_height, self.offset, self.matches, self.vehicle_counter)
+        return frame
+
+    def set_ml_detection(self, enabled):
+        """Switch ML vehicle counting on or off, starting a lazily started detector on first use"""
+        self.use_ml_detection = enabled
+        if enabled and hasattr(self.ml_detector, 'start'):
+            self.ml_detector.start()
+
+    def update_processing_stats(self, elapsed, dropped):
+        """Fold one frame's processing time and the frames dropped before it into the EWMAs"""
+        if self.processing_time == 0.0:
+            self.processing_time, self.dropped_per_frame = elapsed, float(dropped)
+        else:
+            self.processing_time = 0.9 * self.processing_time + 0.1 * elapsed
+            self.dropped_per_frame = 0.9 * self.dropped_per_frame + 0.1 * dropped
+
     def log_event(self, message):
-        """Log an event with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}"
+        """Log an event with timestamp; safe to call from any thread"""
+        try:
+            self._log_q.put_nowait((time.time(), message))
+        except queue.Full:
+            pass  # UI thread is far behind; drop rather than block the caller
+
+    def _drain_log(self):
+        """Move queued log events into log_data and the log display in one batch"""
+        entries = []
+        while len(entries) < 200:
+            try:
+                ts, message = self._log_q.get_nowait()
+            except queue.Empty:
+                break
+            timestamp = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+            entries.append(f"[{timestamp}] {message}")
+
+        if entries:
+            # Add to log data
+            self.log_data.extend(entries)
+
+            # Update log display if it exists
+            if hasattr(self, 'log_tab_controller'):
+                self.log_tab_controller.append_log("\n".join(entries))
 
-        # Add to log data
-        self.log_data.append(log_entry)
+        self.master.after(100, self._drain_log)
 
-        # Update log display if it exists
-        if hasattr(self, 'log_text'):
-            self.log_text.config(state="normal")
-            self.log_text.insert("end", log_entry + "\n")
-            self.log_text.see("end")  # Auto-scroll to the end
-            self.log_text.config(state="disabled")
+    def _report_gpu(self):
+        """Probe and report PyTorch/OpenCV GPU support, then log the diagnostics (safe off the UI thread)"""
+        self.torch_gpu_available = check_gpu_availability()[0]
+        self.diagnose_gpu()
 
     def diagnose_gpu(self):
         """Run GPU diagnostics and log results"""
         results = diagnose_gpu()
-        for result in results:
+        for result in results.splitlines():
             self.log_event(result)
 
     def on_closing(self):
         """Handle window closing event"""
         if messagebox.askyesno("Quit", "Are you sure you want to quit?"):
             self.running = False
+            self.master.after_cancel(self._monitor_job)
+            self.detection_tab_controller.stop_pipeline()
             if self.video_capture is not None:
                 self.video_capture.release()
-            self.master.destroy()
 
-    def monitoring_thread(self):
-        """Background thread for monitoring and periodic logging"""
-        while True:
-            # Record stats every hour if detection is running
-            if self.running:
-                self.record_current_stats()
+            # Don't let the daemon writer thread die with saves still queued
+            flush_writes()
+
+            # Return cached GPU memory once, without importing torch or creating a CUDA context just to do so
+            torch = sys.modules.get('torch')
+            if torch is not None and torch.cuda.is_initialized():
+                torch.cuda.empty_cache()
+            self.master.destroy()
 
-            # Sleep for an hour (3600 seconds)
-            time.sleep(3600)
+    def _monitor_tick(self):
+        """Record stats if detection is running, then reschedule in an hour"""
+        if self.running:
+            self.record_current_stats()
+        self._monitor_job = self.master.after(3_600_000, self._monitor_tick)
 
     # Add any remaining methods you need...
     def save_parking_spaces(self):
@@ -237,17 +379,16 @@ class ParkingManagementSystem:
                 self.log_event("No reference image selected")
                 return False
 
-            if hasattr(self, 'posList'):
-                success = save_parking_positions(
-                    self.config_dir,
-                    self.current_reference_image,
-                    self.posList,
-                    self.log_event
-                )
-                if success:
-                    self.log_event(f"Saved {len(self.posList)} parking spaces")
-                return success
-            return False
+            success = save_parking_positions(
+                self.config_dir,
+                self.current_reference_image,
+                self.parking_xywh,
+                self.log_event
+            )
+            if success:
+                self._ref_state_version += 1
+                self.log_event(f"Saved {len(self.parking_xywh)} parking spaces")
+            return success
 
         except Exception as e:
             self.log_event(f"Error saving parking spaces: {str(e)}")
@@ -256,14 +397,13 @@ class ParkingManagementSystem:
     def clear_all_spaces(self):
         """Clear all defined parking spaces"""
         try:
-            if hasattr(self, 'posList'):
-                self.posList.clear()
-                self.log_event("Cleared all parking spaces")
+            self.clear_slots()
+            self.log_event("Cleared all parking spaces")
 
-                # Update UI if setup tab exists
-                if hasattr(self, 'setup_tab_controller'):
-                    # Refresh canvas to remove drawn spaces
-                    self.load_reference_image()
+            # Remove the drawn spaces from the setup canvas
+            if hasattr(self, 'setup_tab_controller'):
+                self.setup_tab_controller.setup_canvas.delete("slot")
+                self._slot_items.clear()
 
             return True
 
@@ -340,11 +480,11 @@ class ParkingManagementSystem:
                 height = y2 - y1
 
                 if width > 20 and height > 20:  # Minimum size check
-                    self.posList.append([x1, y1, width, height])
-                    self.setup_tab_controller.setup_canvas.create_rectangle(
+                    self.add_slot(x1, y1, width, height)
+                    self._slot_items.append(self.setup_tab_controller.setup_canvas.create_rectangle(
                         x1, y1, x2, y2,
-                        outline='green', width=2
-                    )
+                        outline='green', width=2, tags="slot"
+                    ))
                     self.log_event(f"Added parking space at ({x1}, {y1})")
 
         except Exception as e:
@@ -355,12 +495,17 @@ class ParkingManagementSystem:
         try:
             if hasattr(self, 'setup_tab_controller'):
                 x, y = event.x, event.y
-                for i, (px, py, w, h) in enumerate(self.posList):
-                    if px <= x <= px + w and py <= y <= py + h:
-                        self.posList.pop(i)
-                        self.log_event(f"Removed parking space at ({px}, {py})")
-                        self.load_reference_image()  # Refresh display
-                        break
+
+                # Hit-test every space at once against the (N, 4) array
+                xs, ys, ws, hs = self.parking_xywh.T
+                hits = np.flatnonzero((xs <= x) & (x <= xs + ws) & (ys <= y) & (y <= ys + hs))
+                if hits.size:
+                    i = int(hits[0])
+                    px, py = self.parking_xywh[i, :2].tolist()
+                    self.remove_slot(i)
+                    if i < len(self._slot_items):
+                        self.setup_tab_controller.setup_canvas.delete(self._slot_items.pop(i))
+                    self.log_event(f"Removed parking space at ({px}, {py})")
 
         except Exception as e:
             self.log_event(f"Error handling right click: {str(e)}")
@@ -375,12 +520,17 @@ class ParkingManagementSystem:
                 self.log_event("No reference image selected")
                 return False
 
+            # Nothing to redo if this reference is already drawn and nothing was saved since
+            state = (self.current_reference_image, self._ref_state_version)
+            if state == self._canvas_state:
+                return True
+
             if not os.path.exists(self.current_reference_image):
                 self.log_event(f"Reference image not found: {self.current_reference_image}")
                 return False
 
-            # Load the image
-            img = cv2.imread(self.current_reference_image)
+            # Load the image (decoded once per file version)
+            img = load_image_cached(self.current_reference_image)
             if img is None:
                 self.log_event("Failed to load reference image")
                 return False
@@ -391,20 +541,33 @@ class ParkingManagementSystem:
             self.reference_dimensions[self.current_reference_image] = (img.shape[1], img.shape[0])
 
             # Load associated parking positions
-            if not hasattr(self, 'posList'):
-                self.posList = []
-            self.posList = load_parking_positions(self.config_dir, self.current_reference_image, self.log_event)
+            self.load_parking_positions()
 
             # Update UI if setup tab exists
             if hasattr(self, 'setup_tab_controller'):
-                # Update canvas with new image
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img_pil = Image.fromarray(img_rgb)
-                img_tk = ImageTk.PhotoImage(image=img_pil)
-
-                self.setup_tab_controller.setup_canvas.config(width=img.shape[1], height=img.shape[0])
-                self.setup_tab_controller.setup_canvas.create_image(0, 0, anchor="nw", image=img_tk)
-                self.setup_tab_controller.setup_canvas.image = img_tk
+                # Update canvas with new image, reallocating the buffers only when the size changes
+                height, width = img.shape[:2]
+                if self._ref_rgb_buf is None or self._ref_rgb_buf.shape != (height, width, 3):
+                    self._ref_rgb_buf = np.empty((height, width, 3), np.uint8)
+                    self._ref_pil = Image.frombuffer('RGB', (width, height), self._ref_rgb_buf, 'raw', 'RGB', 0, 1)
+                    self._ref_tk = None
+                cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self._ref_rgb_buf)
+
+                if self._ref_tk is None:
+                    self._ref_tk = ImageTk.PhotoImage(image=self._ref_pil)
+                else:
+                    self._ref_tk.paste(self._ref_pil)
+                img_tk = self._ref_tk
+
+                canvas = self.setup_tab_controller.setup_canvas
+                canvas.delete("all")
+                canvas.config(width=width, height=height)
+                canvas.create_image(0, 0, anchor="nw", image=img_tk)
+                canvas.image = img_tk
+
+                # Draw the spaces on top of the image
+                self._redraw_slots()
+                self._canvas_state = state
 
             return True
 
@@ -462,9 +625,8 @@ class ParkingManagementSystem:
         """Save the current log data to a file"""
         try:
             if hasattr(self, 'log_data') and self.log_data:
-                filename = save_log(self.log_dir, self.log_data, self.log_event)
-                if filename:
-                    self.log_event(f"Log saved to {filename}")
+                # The writer thread logs success or failure once the file is actually written
+                if save_log(self.log_dir, self.log_data, self.log_event):
                     return True
             else:
                 self.log_event("No log data to save")
@@ -498,9 +660,8 @@ class ParkingManagementSystem:
         """Export parking statistics to a CSV file"""
         try:
             if hasattr(self, 'stats_data') and self.stats_data:
-                filename = export_statistics(self.log_dir, self.stats_data, self.log_event)
-                if filename:
-                    self.log_event(f"Statistics exported to {filename}")
+                # The writer thread logs success or failure once the file is actually written
+                if export_statistics(self.log_dir, self.stats_data, self.log_event):
                     return True
             else:
                 self.log_event("No statistics data to export")
@@ -513,9 +674,6 @@ class ParkingManagementSystem:
     def record_current_stats(self):
         """Record current parking statistics"""
         try:
-            if not hasattr(self, 'stats_data'):
-                self.stats_data = []
-
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             stats = (
                 timestamp,
@@ -525,11 +683,17 @@ class ParkingManagementSystem:
                 self.vehicle_counter
             )
 
+            dropping_oldest = len(self.stats_data) == self.stats_data.maxlen
             self.stats_data.append(stats)
 
-            # Update stats tree if available
+            # Update stats tree if available, keeping it in step with stats_data
             if hasattr(self, 'stats_tab_controller'):
-                self.stats_tab_controller.stats_tree.insert("", "end", values=stats)
+                stats_tree = self.stats_tab_controller.stats_tree
+                if dropping_oldest:
+                    children = stats_tree.get_children()
+                    if children:
+                        stats_tree.delete(children[0])
+                stats_tree.insert("", "end", values=stats)
 
             self.log_event(f"Recorded statistics at {timestamp}")
             return True
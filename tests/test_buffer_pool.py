@@ -0,0 +1,35 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.buffer_pool import MatPool
+
+
+def test_returned_buffer_is_reused_for_the_same_shape_and_dtype():
+    pool = MatPool()
+    buf = pool.get((4, 5))
+    pool.put(buf)
+
+    assert pool.get((4, 5)) is buf
+    assert pool.get((4, 5)) is not buf  # Leased again, so a fresh one is allocated
+
+
+def test_buffers_are_keyed_by_shape_and_dtype():
+    pool = MatPool()
+    buf = pool.get((4, 5))
+    pool.put(buf)
+
+    assert pool.get((5, 4)) is not buf
+    assert pool.get((4, 5), np.float32).dtype == np.float32
+    assert pool.get([4, 5]) is buf  # Any sequence naming the same shape matches
+
+
+def test_put_accepts_several_buffers_and_clear_drops_them():
+    pool = MatPool()
+    a, b = pool.get((2, 2)), pool.get((3, 3, 3))
+    pool.put(a, b)
+    assert pool.get((3, 3, 3)) is b
+
+    pool.put(b)
+    pool.clear()
+    assert pool.get((3, 3, 3)) is not b
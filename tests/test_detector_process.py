@@ -0,0 +1,105 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from detection.detector_process import DetectorProcess, detector_worker
+
+
+class _FakeDetector:
+    """Stands in for VehicleDetector: records each frame and reports one box covering it"""
+
+    frames = []
+
+    def __init__(self, confidence_threshold=0.5, use_trt=False):
+        pass
+
+    def detect_vehicles(self, frame):
+        _FakeDetector.frames.append(frame.copy())
+        h, w = frame.shape[:2]
+        return [(0, 0, w, h, 0.9, "car")]
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    """DetectorProcess with small slots whose worker loop runs on a thread in this process"""
+    monkeypatch.setattr("detection.vehicle_detector.VehicleDetector", _FakeDetector)
+    _FakeDetector.frames = []
+    proc = DetectorProcess(max_frame_shape=(60, 80, 3))
+    worker = threading.Thread(
+        target=detector_worker,
+        args=(proc._shm.name, proc._frame_shape, proc._frame_scale, proc._frame_ready, proc._result_q,
+              proc._stop_event, 0.5),
+        daemon=True)
+    worker.start()
+    yield proc
+    proc._stop_event.set()
+    worker.join(timeout=2.0)
+    proc.stop()
+
+
+def _wait_for_detections(proc, frame, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        detections = proc.detect_vehicles(frame)
+        if detections:
+            return detections
+        time.sleep(0.01)
+    pytest.fail("worker produced no detections")
+
+
+def test_frame_is_handed_to_worker_through_shared_memory(detector):
+    frame = np.random.default_rng(3).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+
+    assert _wait_for_detections(detector, frame) == [(0, 0, 50, 40, 0.9, "car")]
+    np.testing.assert_array_equal(_FakeDetector.frames[0], frame)
+
+
+def _wait_for_frames(count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(_FakeDetector.frames) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(_FakeDetector.frames) == count
+
+
+def test_frames_alternate_slots(detector):
+    detector.detect_vehicles(np.full((40, 50, 3), 1, np.uint8))
+    assert detector._slot == 1
+    _wait_for_frames(1)  # The worker is done with the first slot before the second frame is submitted
+
+    detector.detect_vehicles(np.full((40, 50, 3), 2, np.uint8))
+    assert detector._slot == 0
+    _wait_for_frames(2)
+
+    assert [int(f[0, 0, 0]) for f in _FakeDetector.frames] == [1, 2]
+
+
+def test_oversized_frame_is_shrunk_and_boxes_scaled_back(detector):
+    frame = np.zeros((120, 160, 3), np.uint8)
+
+    assert _wait_for_detections(detector, frame) == [(0, 0, 160, 120, 0.9, "car")]
+    assert _FakeDetector.frames[0].shape == (60, 80, 3)
+
+
+def test_dead_worker_raises_instead_of_returning_stale_results():
+    proc = DetectorProcess(max_frame_shape=(60, 80, 3))
+    try:
+        proc._process = SimpleNamespace(pid=1234, exitcode=1, is_alive=lambda: False)
+        assert proc.crashed
+        with pytest.raises(RuntimeError, match="exited with code 1"):
+            proc.detect_vehicles(np.zeros((40, 50, 3), np.uint8))
+    finally:
+        proc.stop()
+
+
+def test_stop_is_idempotent():
+    proc = DetectorProcess(max_frame_shape=(60, 80, 3))
+    proc.stop()
+    proc.stop()
+    assert not proc.crashed  # Exiting after stop() is not a failure
@@ -0,0 +1,97 @@
+import os
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from utils.file_utils import load_parking_positions, save_parking_positions, save_log, export_statistics, \
+    flush_writes, _submit_write
+
+POSITIONS = [(10, 20, 107, 48), (130, 20, 107, 48), (250, 75, 107, 48)]
+
+
+def test_positions_round_trip_through_npy(tmp_path):
+    events = []
+    assert save_parking_positions(str(tmp_path), "lot.png", POSITIONS, events.append)
+    flush_writes()
+
+    assert os.path.exists(tmp_path / "CarParkPos_lot.npy")
+    assert events == ["Saved 3 parking spaces for lot.png"]
+    assert load_parking_positions(str(tmp_path), "lot.png") == [list(p) for p in POSITIONS]
+
+
+def test_missing_positions_load_empty(tmp_path):
+    assert load_parking_positions(str(tmp_path), "lot.png") == []
+
+
+def test_legacy_pickle_is_migrated_to_npy(tmp_path):
+    with open(tmp_path / "CarParkPos_lot", "wb") as f:
+        pickle.dump(POSITIONS, f)
+
+    assert load_parking_positions(str(tmp_path), "lot.png") == POSITIONS
+    np.testing.assert_array_equal(np.load(tmp_path / "CarParkPos_lot.npy"), np.array(POSITIONS, np.int32))
+
+
+class _Exploit:
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return os.mkdir, (self.marker,)
+
+
+def test_malicious_legacy_pickle_is_rejected(tmp_path):
+    marker = str(tmp_path / "pwned")
+    with open(tmp_path / "CarParkPos_lot", "wb") as f:
+        pickle.dump([_Exploit(marker)], f)
+
+    events = []
+    assert load_parking_positions(str(tmp_path), "lot.png", events.append) == []
+    assert not os.path.exists(marker)
+    assert not os.path.exists(tmp_path / "CarParkPos_lot.npy")
+    assert len(events) == 1 and "Unexpected object" in events[0]
+
+
+def test_log_save_is_reported_once_written(tmp_path):
+    events = []
+    filename = save_log(str(tmp_path), ["first", "second"], events.append)
+    flush_writes()
+
+    assert events == [f"Log saved to {filename}"]
+    with open(filename) as f:
+        assert f.read() == "first\nsecond\n"
+
+
+def test_statistics_export_is_reported_once_written(tmp_path):
+    events = []
+    filename = export_statistics(str(tmp_path), [("12:00", 10, 4, 6, 3)], events.append)
+    flush_writes()
+
+    assert events == [f"Statistics exported to {filename}"]
+    with open(filename) as f:
+        assert f.read().splitlines()[1] == "12:00,10,4,6,3"
+
+
+def test_failed_write_is_reported_and_the_writer_keeps_going(tmp_path):
+    events = []
+    missing = str(tmp_path / "missing")
+    save_log(missing, ["lost"], events.append)
+    save_parking_positions(missing, "lot.png", POSITIONS, events.append)
+    filename = save_log(str(tmp_path), ["kept"], events.append)
+    flush_writes()
+
+    assert events[0].startswith("Failed to save log:")
+    assert events[1].startswith("Failed to save parking spaces:")
+    assert events[2] == f"Log saved to {filename}"
+    assert not os.path.exists(missing)
+
+
+def test_on_error_receives_the_exception(tmp_path):
+    errors, done = [], []
+    _submit_write(str(tmp_path / "missing" / "out.bin"), b"data", lambda: done.append(True), errors.append)
+    flush_writes()
+
+    assert done == []
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+from utils.gpu_utils import _torch_adaptive_threshold, gpu_adaptive_threshold, gpu_adaptive_threshold_batch
+
+needs_torch_cuda = pytest.mark.skipif(torch is None or not torch.cuda.is_available(),
+                                      reason="needs PyTorch with a CUDA device")
+needs_cv_cuda = pytest.mark.skipif(not hasattr(cv2, "cuda") or cv2.cuda.getCudaEnabledDeviceCount() == 0,
+                                   reason="needs a CUDA-enabled OpenCV build and device")
+
+
+@pytest.fixture
+def gray():
+    rng = np.random.default_rng(2)
+    img = rng.normal(120, 25, (96, 128)).clip(0, 255).astype(np.uint8)
+    cv2.rectangle(img, (0, 0), (40, 30), 30, -1)  # Dark block against the border
+    return img
+
+
+@pytest.fixture
+def large_gray(gray):
+    """Large enough to pass the PCIe break-even size, so the GPU path is actually taken"""
+    return cv2.resize(gray, (1024, 768), interpolation=cv2.INTER_NEAREST)
+
+
+@needs_torch_cuda
+@pytest.mark.parametrize("method", [cv2.ADAPTIVE_THRESH_MEAN_C, cv2.ADAPTIVE_THRESH_GAUSSIAN_C])
+@pytest.mark.parametrize("threshold_type", [cv2.THRESH_BINARY, cv2.THRESH_BINARY_INV])
+def test_torch_adaptive_threshold_matches_opencv(gray, method, threshold_type):
+    expected = cv2.adaptiveThreshold(gray, 255, method, threshold_type, 25, 16)
+    result = _torch_adaptive_threshold(gray, 255, method, threshold_type, 25, 16)
+
+    assert result.shape == expected.shape and result.dtype == np.uint8
+    # The local mean may round one grey level differently from OpenCV's fixed-point filters
+    assert (result != expected).mean() < 0.01
+
+
+@needs_torch_cuda
+def test_torch_adaptive_threshold_reuses_pinned_buffer(gray):
+    first = _torch_adaptive_threshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
+    second = _torch_adaptive_threshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
+    np.testing.assert_array_equal(first, second)
+
+
+@needs_cv_cuda
+@pytest.mark.parametrize("method", [cv2.ADAPTIVE_THRESH_MEAN_C, cv2.ADAPTIVE_THRESH_GAUSSIAN_C])
+@pytest.mark.parametrize("threshold_type", [cv2.THRESH_BINARY, cv2.THRESH_BINARY_INV])
+@pytest.mark.parametrize("c", [16, 0.5, -3])
+def test_cuda_adaptive_threshold_matches_opencv(large_gray, method, threshold_type, c):
+    expected = cv2.adaptiveThreshold(large_gray, 255, method, threshold_type, 25, c)
+    single = gpu_adaptive_threshold(large_gray, 255, method, threshold_type, 25, c, cv_gpu_available=True)
+    batch = gpu_adaptive_threshold_batch([large_gray, large_gray], 255, method, threshold_type, 25, c,
+                                         cv_gpu_available=True)
+
+    for result in [single] + batch:
+        assert result.shape == expected.shape and result.dtype == np.uint8
+        assert (result != expected).mean() < 0.01
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("cvzone")
+pytest.importorskip("PIL.ImageTk")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", ["parking_management", "detection.detector_process", "utils.gpu_utils"])
+def test_ui_side_modules_do_not_import_torch(module):
+    # A fresh interpreter, since other tests in this session may already have loaded torch
+    code = f"import sys, {module}; sys.exit('torch' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
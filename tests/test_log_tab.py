@@ -0,0 +1,98 @@
+from collections import deque
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from ui.log_tab import LogTab
+
+
+class _FakeParent:
+    """Records after() calls instead of scheduling them on a Tk event loop"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay_ms, callback):
+        self.scheduled.append((delay_ms, callback))
+        return len(self.scheduled)
+
+
+class _FakeText:
+    """The slice of the Tk Text API LogTab uses, with Tk's line.column indices"""
+
+    def __init__(self):
+        self.content = ""
+        self.inserts = 0
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, text):
+        assert index == "end"
+        self.content += text
+        self.inserts += 1
+
+    def index(self, index):
+        assert index == "end-1c"
+        return f"{self.content.count(chr(10)) + 1}.{len(self.content.rsplit(chr(10), 1)[-1])}"
+
+    def delete(self, start, end):
+        if end == "end":
+            self.content = ""
+            return
+        first_kept = int(end.split(".")[0])  # Lines start at 1; "k.0" keeps line k onwards
+        self.content = "".join(self.content.splitlines(keepends=True)[first_kept - 1:])
+
+    def see(self, index):
+        pass
+
+
+def _log_tab():
+    tab = LogTab.__new__(LogTab)
+    tab.parent = _FakeParent()
+    tab._pending = deque()
+    tab._flush_job = None
+    tab.log_text = _FakeText()
+    return tab
+
+
+def test_appends_are_coalesced_into_one_flush():
+    tab = _log_tab()
+    for i in range(3):
+        tab.append_log(f"event {i}")
+
+    assert len(tab.parent.scheduled) == 1  # One flush scheduled for the whole burst
+    delay_ms, flush = tab.parent.scheduled[0]
+    assert delay_ms == 50
+    assert tab.log_text.content == ""
+
+    flush()
+    assert tab.log_text.content == "event 0\nevent 1\nevent 2\n"
+    assert tab.log_text.inserts == 1
+
+    tab.append_log("event 3")  # The next append schedules a new flush
+    assert len(tab.parent.scheduled) == 2
+
+
+def test_clear_display_drops_pending_lines():
+    tab = _log_tab()
+    tab.append_log("stale")
+    tab.clear_display()
+
+    tab.parent.scheduled[0][1]()
+    assert tab.log_text.content == ""
+
+
+def test_display_is_trimmed_to_the_most_recent_lines(monkeypatch):
+    monkeypatch.setattr(LogTab, "MAX_LINES", 5)
+    tab = _log_tab()
+    for i in range(8):
+        tab.append_log(f"event {i}")
+    tab.parent.scheduled[0][1]()
+
+    assert tab.log_text.content.splitlines() == [f"event {i}" for i in range(3, 8)]
+
+    tab.append_log("event 8")
+    tab.parent.scheduled[1][1]()
+    assert tab.log_text.content.splitlines() == [f"event {i}" for i in range(4, 9)]
@@ -0,0 +1,143 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("cvzone")
+pytest.importorskip("PIL.ImageTk")
+
+import parking_management
+from parking_management import ParkingManagementSystem
+
+
+class _FakeCanvas:
+    """Records rectangles like a Tk canvas, including deletion by item id and by tag"""
+
+    def __init__(self):
+        self.items = {}
+        self._next_id = 0
+
+    def create_rectangle(self, x1, y1, x2, y2, **options):
+        self._next_id += 1
+        self.items[self._next_id] = ((x1, y1, x2, y2), options.get("tags"))
+        return self._next_id
+
+    def delete(self, item):
+        if item == "all":
+            self.items.clear()
+        elif isinstance(item, str):
+            self.items = {k: v for k, v in self.items.items() if v[1] != item}
+        else:
+            del self.items[item]
+
+    def rects(self):
+        return sorted(rect for rect, _ in self.items.values())
+
+
+def _controller(canvas=None):
+    """Controller with only the slot store and setup canvas state, without building the Tk UI"""
+    pms = ParkingManagementSystem.__new__(ParkingManagementSystem)
+    pms._cleanup_lock = threading.Lock()
+    pms._pos = np.zeros((16, 4), dtype=np.int32)
+    pms._n = 0
+    pms.slot_layout = None
+    pms._ref_state_version = 0
+    pms._positions_state = None
+    pms._canvas_state = None
+    pms._slot_items = []
+    pms.config_dir = "config"
+    pms.events = []
+    pms.log_event = pms.events.append
+    if canvas is not None:
+        pms.setup_tab_controller = SimpleNamespace(setup_canvas=canvas)
+    return pms
+
+
+def _rect(x, y, w, h):
+    return x, y, x + w, y + h
+
+
+def test_right_click_after_loading_new_positions_removes_the_clicked_space(monkeypatch):
+    canvas = _FakeCanvas()
+    pms = _controller(canvas)
+    layouts = {"a.png": [(0, 0, 50, 30), (100, 0, 50, 30), (200, 0, 50, 30)],
+               "b.png": [(10, 100, 40, 40), (60, 100, 40, 40)]}
+    monkeypatch.setattr(parking_management, "load_parking_positions", lambda _dir, ref, _log: layouts[ref])
+
+    pms.load_parking_positions("a.png")
+    pms._canvas_state = ("a.png", 0)  # As left by load_reference_image
+    pms.load_parking_positions("b.png")  # e.g. the video source changed
+
+    assert pms._canvas_state is None
+    assert canvas.rects() == [_rect(*p) for p in layouts["b.png"]]
+
+    pms.on_right_click(SimpleNamespace(x=70, y=120))
+
+    assert pms.posList == [[10, 100, 40, 40]]
+    assert canvas.rects() == [_rect(10, 100, 40, 40)]
+    assert pms.events == ["Removed parking space at (60, 100)"]
+
+
+def test_right_click_tolerates_missing_canvas_items():
+    canvas = _FakeCanvas()
+    pms = _controller(canvas)
+    pms.add_slot(0, 0, 50, 30)  # Added without a canvas rectangle
+
+    pms.on_right_click(SimpleNamespace(x=10, y=10))
+
+    assert pms.posList == []
+    assert pms.events == ["Removed parking space at (0, 0)"]
+
+
+def test_crashed_ml_detector_falls_back_to_traditional_counting():
+    pms = _controller()
+    pms.ml_detector = SimpleNamespace(crashed=True, exitcode=1)
+    pms.use_ml_detection = True
+    pms.bg_subtractor = None
+    pms.min_contour_width = pms.min_contour_height = ParkingManagementSystem.MIN_CONTOUR_SIZE
+    pms.line_height = ParkingManagementSystem.DEFAULT_LINE_HEIGHT
+    pms.offset = ParkingManagementSystem.DEFAULT_OFFSET
+    pms.matches = []
+    pms.vehicle_counter = 0
+
+    pms.process_counting_frame(np.zeros((480, 640, 3), np.uint8))
+
+    assert not pms.use_ml_detection
+    assert pms.bg_subtractor is not None
+    assert pms.events == ["ML detector process exited with code 1; falling back to traditional counting"]
+
+
+def test_slot_store_grows_past_its_initial_capacity():
+    pms = _controller()
+    for i in range(40):
+        pms.add_slot(i, 2 * i, 10, 20)
+
+    assert len(pms._pos) >= 40
+    assert pms.parking_xywh.shape == (40, 4) and pms.parking_xywh.dtype == np.int32
+    assert pms.posList[39] == [39, 78, 10, 20]
+
+
+def test_remove_slot_keeps_the_order_of_the_rest():
+    pms = _controller()
+    pms.posList = [(0, 0, 1, 1), (1, 1, 1, 1), (2, 2, 1, 1)]
+    pms.slot_layout = object()
+
+    pms.remove_slot(1)
+
+    assert pms.posList == [[0, 0, 1, 1], [2, 2, 1, 1]]
+    assert pms.slot_layout is None  # Cached layout is invalidated
+
+
+def test_clear_slots_and_posList_round_trip():
+    pms = _controller()
+    pms.posList = [[5, 6, 7, 8]]
+    assert pms.posList == [[5, 6, 7, 8]]
+    assert isinstance(pms.posList, list)
+
+    pms.clear_slots()
+    assert pms.posList == [] and pms.parking_xywh.shape == (0, 4)
+
+    pms.add_slot(1, 2, 3, 4)  # The backing array is reused after clearing
+    assert pms.posList == [[1, 2, 3, 4]]
@@ -0,0 +1,72 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("cvzone")
+
+from detection.vehicle_counting import create_background_subtractor, detect_vehicles_traditional
+
+SHAPE = (240, 320, 3)
+
+
+def _background():
+    return np.full(SHAPE, 80, np.uint8)
+
+
+def _with_block(x, y, w, h):
+    frame = _background()
+    frame[y:y + h, x:x + w] = 220
+    return frame
+
+
+def _run(bg_subtractor, frame, line_height=200, offset=10, matches=None, counter=0):
+    return detect_vehicles_traditional(frame, bg_subtractor, 40, 40, line_height, offset, matches or [], counter)
+
+
+@pytest.fixture
+def learned_subtractor():
+    """MOG2 model that has settled on the empty scene"""
+    bg_subtractor = create_background_subtractor()
+    for _ in range(30):
+        _run(bg_subtractor, _background())
+    return bg_subtractor
+
+
+def test_static_scene_produces_no_detections(learned_subtractor):
+    _, matches, counter = _run(learned_subtractor, _background())
+    assert matches == [] and counter == 0
+
+
+def test_new_object_is_foreground(learned_subtractor):
+    _, matches, counter = _run(learned_subtractor, _with_block(100, 60, 60, 60))
+
+    assert counter == 0
+    assert len(matches) == 1
+    cx, cy = matches[0]
+    assert abs(cx - 130) <= 2 and abs(cy - 90) <= 2
+
+
+def test_blobs_below_the_minimum_size_are_ignored(learned_subtractor):
+    frame = _with_block(20, 20, 60, 60)
+    frame[150:170, 200:220] = 220  # 20x20: smaller than the 40x40 minimum
+
+    _, matches, _ = _run(learned_subtractor, frame)
+
+    assert len(matches) == 1
+    assert matches[0][0] < 100  # Only the large blob on the left
+
+
+def test_separate_blobs_are_separate_vehicles(learned_subtractor):
+    frame = _with_block(20, 20, 60, 60)
+    frame[20:80, 200:260] = 220
+
+    _, matches, _ = _run(learned_subtractor, frame)
+
+    assert sorted(x // 10 for x, _ in matches) == [4, 22]  # Centroids near x=50 and x=230
+
+
+def test_blob_on_the_line_is_counted_once(learned_subtractor):
+    _, matches, counter = _run(learned_subtractor, _with_block(100, 60, 60, 60), line_height=90, counter=5)
+
+    assert counter == 6
+    assert matches == []  # Counted centroids are not tracked any further
@@ -0,0 +1,54 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("cv2")
+
+from detection.vehicle_detector import VehicleDetector
+
+
+def _detector(confidence_threshold=0.5):
+    """Detector with only the state _filter_predictions reads, so no model is loaded"""
+    detector = VehicleDetector.__new__(VehicleDetector)
+    detector.confidence_threshold = confidence_threshold
+    detector.vehicle_classes = [2, 3, 5, 6, 7, 8]
+    detector.vehicle_class_tensor = torch.tensor(detector.vehicle_classes)
+    return detector
+
+
+def _prediction():
+    return {
+        "boxes": torch.tensor([[10., 20., 110., 80.],   # car, confident
+                               [30., 30., 60., 90.],    # person, confident
+                               [200., 40., 300., 120.],  # truck, below threshold
+                               [5.5, 6.5, 50.9, 40.2]]),  # bus, just above the threshold
+        "scores": torch.tensor([0.9, 0.95, 0.3, 0.51]),
+        "labels": torch.tensor([3, 1, 8, 6]),
+    }
+
+
+def test_only_confident_vehicles_are_kept():
+    detections = _detector()._filter_predictions(_prediction(), 1.0)
+
+    assert [(label, round(score, 2)) for *_, score, label in detections] == [(3, 0.9), (6, 0.51)]
+    assert detections[0][:4] == (10, 20, 110, 80)
+    assert detections[1][:4] == (5, 6, 50, 40)  # Truncated to ints
+    assert all(isinstance(v, int) for v in detections[0][:4])
+
+
+def test_boxes_are_scaled_back_to_the_original_frame():
+    detections = _detector()._filter_predictions(_prediction(), 0.5)
+    assert detections[0][:4] == (20, 40, 220, 160)
+
+
+def test_threshold_is_exclusive():
+    prediction = _prediction()
+    prediction["scores"][0] = 0.5
+    labels = [label for *_, label in _detector()._filter_predictions(prediction, 1.0)]
+    assert labels == [6]
+
+
+def test_nothing_confident_gives_an_empty_list():
+    prediction = _prediction()
+    prediction["scores"].fill_(0.1)
+    assert _detector()._filter_predictions(prediction, 1.0) == []
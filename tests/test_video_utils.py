@@ -0,0 +1,39 @@
+import queue
+import threading
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from utils.video_utils import LifoBuffer
+
+
+def test_pop_latest_returns_newest_and_discards_the_rest():
+    buf = LifoBuffer(maxlen=3)
+    for i in range(3):
+        buf.push(i)
+
+    assert buf.pop_latest(timeout=0) == 2
+    with pytest.raises(queue.Empty):
+        buf.pop_latest(timeout=0)
+    assert buf.take_dropped() == 2
+
+
+def test_push_overwrites_oldest_when_full():
+    buf = LifoBuffer(maxlen=2)
+    for i in range(5):
+        buf.push(i)
+
+    assert buf.pop_latest(timeout=0) == 4
+    assert buf.take_dropped() == 4  # Three overwritten on push, one discarded on pop
+    assert buf.take_dropped() == 0
+
+
+def test_pop_latest_wakes_on_push_from_another_thread():
+    buf = LifoBuffer()
+    timer = threading.Timer(0.05, buf.push, args=("frame",))
+    timer.start()
+    try:
+        assert buf.pop_latest(timeout=2.0) == "frame"
+    finally:
+        timer.cancel()
@@ -2,7 +2,14 @@ from tkinter import Frame, Label, Button, StringVar, OptionMenu, BooleanVar, Sca
     BOTH
 from PIL import Image, ImageTk
 import cv2
+import numpy as np
 import os  # Add os import for path handling
+import queue
+import threading
+import time
+
+from utils.buffer_pool import MatPool
+from utils.video_utils import open_video_capture, LifoBuffer
 
 
 class DetectionTab:
@@ -12,9 +19,7 @@ class DetectionTab:
 
         # Create videos directory if it doesn't exist
         self.videos_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "videos"))
-        if not os.path.exists(self.videos_dir):
-            os.makedirs(self.videos_dir)
-            print(f"Created videos directory at: {self.videos_dir}")
+        os.makedirs(self.videos_dir, exist_ok=True)
 
         # Setup status panel first
         self._setup_status_panel()
@@ -25,6 +30,11 @@ class DetectionTab:
         self.use_ml_var = BooleanVar(value=False)
         self.running = False
         self.current_frame = None
+        self._stop_event = None  # Stop event of the running reader/worker pipeline, if any
+        self._rgb_pool = MatPool()  # RGB display buffers, leased by the worker and returned after display
+        self._draw_time = 0.0  # Smoothed cost of drawing one frame on the Tk thread, in seconds
+        self._visible = True  # Whether the video label is on screen, read by the worker thread
+        self._display_job = None  # Pending after() job of process_video_frame
 
         # Setup remaining UI components
         self._setup_control_panel()
@@ -33,6 +43,7 @@ class DetectionTab:
         # Bind video source change
         self.video_source_var.trace('w', self._on_video_source_change)
         self.detection_mode_var.trace('w', self._on_detection_mode_change)
+        self.use_ml_var.trace('w', self._on_use_ml_change)
 
     def _setup_control_panel(self):
         """Setup the control panel with buttons and options"""
@@ -42,7 +53,14 @@ class DetectionTab:
         # Video source selection
         Label(control_frame, text="Video Source:").pack(side=LEFT, padx=5)
         video_sources = ["carPark.mp4", "Video.mp4", "sample5.mp4", "0", "newVideo1.mp4", "newVideo2.mp4"]
-        OptionMenu(control_frame, self.video_source_var, *video_sources).pack(side=LEFT, padx=5)
+        source_menu = OptionMenu(control_frame, self.video_source_var, *video_sources)
+        source_menu.pack(side=LEFT, padx=5)
+
+        # Resolve file sources once; files missing at startup are shown but cannot be picked
+        self._source_paths = {name: os.path.join(self.videos_dir, name) for name in video_sources if name != "0"}
+        for index, name in enumerate(video_sources):
+            if name in self._source_paths and not os.path.isfile(self._source_paths[name]):
+                source_menu["menu"].entryconfig(index, state="disabled")
 
         # Detection mode selection
         Label(control_frame, text="Mode:").pack(side=LEFT, padx=5)
@@ -65,6 +83,37 @@ class DetectionTab:
 
         self.video_label = Label(self.video_frame, bg='black')
         self.video_label.pack(fill=BOTH, expand=True)
+        self._photo = None  # PhotoImage shown by video_label, updated in place while the size is unchanged
+
+        # Current label size, read by the worker thread to downscale frames before display
+        self._display_size = (0, 0)
+        self.video_label.bind("<Configure>", self._on_video_resize)
+        self.video_label.bind("<Visibility>", self._on_video_visible)
+
+    def _on_video_resize(self, event):
+        """Remember the video label size (a single tuple assignment, so safe to read from the worker)"""
+        self._display_size = (event.width, event.height)
+
+    def _on_video_visible(self, event):
+        """Redraw right away when the label comes back on screen instead of waiting out the hidden cadence"""
+        if self.running and self._display_job is not None:
+            self.parent.after_cancel(self._display_job)
+            self._schedule_display(1)
+
+    def _schedule_display(self, delay_ms):
+        """Run process_video_frame after delay_ms"""
+        self._display_job = self.parent.after(delay_ms, self.process_video_frame)
+
+    def _fit_to_display(self, frame):
+        """Shrink frame to fit the video label, keeping its aspect ratio"""
+        width, height = self._display_size
+        if width <= 1 or height <= 1:
+            return frame  # Label not laid out yet
+        scale = min(width / frame.shape[1], height / frame.shape[0])
+        if scale >= 1.0:
+            return frame
+        size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
 
     def _setup_status_panel(self):
         """Setup the status information panel"""
@@ -75,6 +124,10 @@ class DetectionTab:
         self.status_info = Label(status_frame, text="Status: Ready", font=("Arial", 10))
         self.status_info.pack(side=LEFT, padx=5)
 
+        # Frames the latest-frame buffer drops per processed frame, and the smoothed processing time
+        self.throughput_info = Label(status_frame, text="", font=("Arial", 10))
+        self.throughput_info.pack(side=RIGHT, padx=5)
+
     def toggle_detection(self):
         """Toggle detection on/off"""
         try:
@@ -83,22 +136,27 @@ class DetectionTab:
                 self.running = True
 
                 # Initialize video source
-                source = self.video_source_var.get()
-                if source == "0":
-                    source = 0  # Webcam
-                else:
-                    # Use videos directory path
-                    source = os.path.join(self.videos_dir, source)
-                    if not os.path.exists(source):
-                        raise Exception(f"Video file not found: {source}")
+                name = self.video_source_var.get()
+                source = 0 if name == "0" else self._source_paths[name]  # 0 is the webcam
 
-                # Start detection in controller
-                self.controller.video_capture = cv2.VideoCapture(source)
+                # Start detection in controller; a missing file simply fails to open
+                self.controller.video_capture = open_video_capture(source)
                 if not self.controller.video_capture.isOpened():
                     raise Exception(f"Failed to open video source: {source}")
 
-                # Start processing
+                # Live sources drop frames on their own; only files are skipped through
+                self.controller.capture_fps = 0.0 if source == 0 else \
+                    self.controller.video_capture.get(cv2.CAP_PROP_FPS)
+                self.controller.processing_time = 0.0
+                self.controller.dropped_per_frame = 0.0
+                self._draw_time = 0.0
+
+                # Start processing with a fresh background model for the new source
+                self.controller.bg_subtractor = None
                 self.controller.running = True
+                self._start_pipeline()
+                if self._display_job is not None:
+                    self.parent.after_cancel(self._display_job)  # Left over from a quick stop/start
                 self.process_video_frame()
 
             else:
@@ -106,6 +164,7 @@ class DetectionTab:
                 self.start_button.config(text="Start")
                 self.running = False
                 self.controller.running = False
+                self.stop_pipeline()
 
                 # Release video capture
                 if self.controller.video_capture:
@@ -117,42 +176,167 @@ class DetectionTab:
             self.status_info.config(text=f"Error: {str(e)}")
             self.running = False
             self.controller.running = False
-
-    def process_video_frame(self):
-        """Process and display video frames"""
-        if self.running and self.controller.video_capture:
+            self.stop_pipeline()
+
+    def _start_pipeline(self):
+        """Start the reader and worker threads feeding process_video_frame"""
+        self._stop_event = threading.Event()
+        self._read_q = LifoBuffer(maxlen=2)  # Decoded BGR frames; the worker always takes the newest
+        self._disp_q = queue.Queue(maxsize=2)  # Processed RGB frames; None marks the end of the stream
+        mode = self.detection_mode_var.get()  # Tk variables must not be read from the worker
+
+        # Threads get their own references so a lingering thread never touches a restarted pipeline
+        self._reader_thread = threading.Thread(
+            target=self._reader, args=(self._stop_event, self._read_q), daemon=True)
+        self._worker_thread = threading.Thread(
+            target=self._worker, args=(mode, self._stop_event, self._read_q, self._disp_q), daemon=True)
+        self._reader_thread.start()
+        self._worker_thread.start()
+
+    def stop_pipeline(self):
+        """Stop the reader and worker threads and wait for them to exit"""
+        if self._stop_event is None:
+            return
+        self._stop_event.set()
+        for thread in (self._reader_thread, self._worker_thread):
+            if thread.is_alive():
+                thread.join(timeout=1.0)
+        self._stop_event = None
+
+    @staticmethod
+    def _put(q, item, stop_event):
+        """Block on a full queue for back-pressure, but give up once the pipeline is stopping"""
+        while not stop_event.is_set():
             try:
-                ret, frame = self.controller.video_capture.read()
-                if ret:
-                    # Convert frame to RGB for PIL
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                    # Process frame based on detection mode
-                    if self.detection_mode_var.get() == "parking":
-                        processed_frame = self.controller.process_parking_frame(frame)
-                        frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    else:  # counting mode
-                        processed_frame = self.controller.process_counting_frame(frame)
-                        frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-
-                    # Convert to PIL Image and then to PhotoImage
-                    img = Image.fromarray(frame_rgb)
-                    imgtk = ImageTk.PhotoImage(image=img)
-
-                    # Update display
-                    self.video_label.config(image=imgtk)
-                    self.video_label.image = imgtk  # Keep a reference!
-
-                    # Schedule next frame
-                    self.parent.after(30, self.process_video_frame)
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _reader(self, stop_event, read_q):
+        """Reader thread: decode frames into the latest-frame buffer at the source rate"""
+        capture = self.controller.video_capture
+        # Files are paced to their frame rate so they play in real time; live sources pace themselves
+        interval = 1.0 / self.controller.capture_fps if self.controller.capture_fps > 0 else 0.0
+        next_time = time.perf_counter()
+        while not stop_event.is_set():
+            ret, frame = capture.read()
+            if not ret:
+                read_q.push(None)
+                return
+            # Never blocks: frames the worker had no time for are dropped here
+            read_q.push(frame)
+
+            if interval:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
                 else:
-                    # Video ended or failed to read frame
-                    self.toggle_detection()
-                    self.controller.log_event("Video ended or failed to read frame")
+                    next_time = time.perf_counter()  # Decoding fell behind; don't try to catch up
+
+    def _worker(self, mode, stop_event, read_q, disp_q):
+        """Worker thread: run detection on each decoded frame and queue it for display"""
+        while not stop_event.is_set():
+            try:
+                frame = read_q.pop_latest(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
+                self._put(disp_q, None, stop_event)
+                return
+
+            try:
+                start = time.perf_counter()
+
+                # Process frame based on detection mode
+                if mode == "parking":
+                    processed_frame = self.controller.process_parking_frame(frame)
+                else:  # counting mode
+                    processed_frame = self.controller.process_counting_frame(frame)
+
+                self.controller.update_processing_stats(time.perf_counter() - start, read_q.take_dropped())
 
+                # Nobody can see the frame (other tab active or window minimized), so skip display work
+                if not self._visible:
+                    continue
+
+                # Downscale to the label first so the conversion and Tk copy only touch displayed pixels
+                processed_frame = self._fit_to_display(processed_frame)
+
+                # Convert frame to RGB for PIL into a recycled buffer
+                frame_rgb = self._rgb_pool.get(processed_frame.shape)
+                cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB, dst=frame_rgb)
             except Exception as e:
                 self.controller.log_event(f"Processing error: {str(e)}")
-                self.toggle_detection()
+                self._put(disp_q, None, stop_event)
+                return
+
+            if not self._put(disp_q, frame_rgb, stop_event):
+                return
+
+    def process_video_frame(self):
+        """Display the next processed frame; decoding and detection run on the pipeline threads"""
+        self._display_job = None
+        if not self.running:
+            return
+
+        # Tab switches and minimizing hide the label without unmapping it, so ask Tk each time
+        self._visible = bool(self.video_label.winfo_viewable())
+
+        try:
+            frame_rgb = self._disp_q.get_nowait()
+        except queue.Empty:
+            self._schedule_display(1 if self._visible else 200)
+            return
+
+        # If the display fell behind, skip straight to the newest frame instead of drawing stale ones
+        while frame_rgb is not None:
+            try:
+                newer = self._disp_q.get_nowait()
+            except queue.Empty:
+                break
+            self._rgb_pool.put(frame_rgb)
+            frame_rgb = newer
+
+        if frame_rgb is None:
+            # Video ended, failed to read a frame, or processing failed
+            self.toggle_detection()
+            self.controller.log_event("Video ended or failed to read frame")
+            return
+
+        if not self._visible:
+            # Converted before the label was hidden; just recycle it and poll slowly for end of stream
+            self._rgb_pool.put(frame_rgb)
+            self._schedule_display(200)
+            return
+
+        # Update display, pasting into the existing PhotoImage unless the frame size changed
+        start = time.perf_counter()
+        # Wrap the pooled buffer without copying; both the PhotoImage constructor and paste copy the pixels out
+        frame_rgb = np.ascontiguousarray(frame_rgb)
+        img = Image.frombuffer("RGB", (frame_rgb.shape[1], frame_rgb.shape[0]), frame_rgb, "raw", "RGB", 0, 1)
+        if self._photo is None or (self._photo.width(), self._photo.height()) != img.size:
+            self._photo = ImageTk.PhotoImage(image=img)
+            self.video_label.config(image=self._photo)
+        else:
+            self._photo.paste(img)
+        self._rgb_pool.put(frame_rgb)  # PhotoImage holds its own copy of the pixels
+
+        self.controller.update_status_info()
+        self.throughput_info.config(text=f"Dropped: {self.controller.dropped_per_frame:.1f} frames/frame "
+                                         f"({self.controller.processing_time * 1000:.0f} ms/frame)")
+
+        elapsed = time.perf_counter() - start
+        self._draw_time = elapsed if self._draw_time == 0.0 else 0.9 * self._draw_time + 0.1 * elapsed
+
+        # The next frame can't arrive before the slower of the source cadence and the worker, so sleep
+        # through half of that gap (less our own drawing cost) instead of polling every millisecond
+        fps = self.controller.capture_fps
+        interval = max(1.0 / fps if fps > 0 else 0.0, self.controller.processing_time)
+        delay_ms = int((interval / 2 - self._draw_time) * 1000)
+        self._schedule_display(max(1, delay_ms))
 
     def _toggle_ml_detection(self):
         """Toggle ML detection mode"""
@@ -216,4 +400,9 @@ class DetectionTab:
             self.controller.detection_mode = mode
             self.controller.log_event(f"Changed detection mode to {mode}")
         except Exception as e:
-            self.controller.log_event(f"Error changing detection mode: {str(e)}")
\ No newline at end of file
+            self.controller.log_event(f"Error changing detection mode: {str(e)}")
+
+    def _on_use_ml_change(self, *args):
+        """Propagate the ML toggle to the controller"""
+        self.controller.set_ml_detection(self.use_ml_var.get())
+        self.controller.log_event(f"ML detection {'enabled' if self.controller.use_ml_detection else 'disabled'}")
\ No newline at end of file
@@ -3,6 +3,7 @@ Log Tab for Smart Parking Management System
 Displays and manages system logs
 """
 
+from collections import deque
 from tkinter import Text, Label, Button, Frame, Scrollbar
 from tkinter import LEFT, RIGHT, BOTH, X, Y
 
@@ -10,6 +11,8 @@ from tkinter import LEFT, RIGHT, BOTH, X, Y
 class LogTab:
     """Log tab UI class for system logs"""
 
+    MAX_LINES = 5000  # Older lines are trimmed from the display (the full log stays in controller.log_data)
+
     def __init__(self, parent, controller):
         """
         Initialize the log tab
@@ -21,6 +24,10 @@ class LogTab:
         self.controller = controller
         self.parent = parent
 
+        # Lines waiting for the next flush, so the Text widget is updated at most every 50 ms
+        self._pending = deque()
+        self._flush_job = None
+
         # Set up log tab components
         self._setup_log_panel()
 
@@ -57,18 +64,36 @@ class LogTab:
 
     def append_log(self, text):
         """
-        Append text to the log display
+        Queue text for the log display; it is inserted on the next flush
 
         Args:
             text: The text to append
         """
+        self._pending.append(text)
+        if self._flush_job is None:
+            self._flush_job = self.parent.after(50, self._flush_log)
+
+    def _flush_log(self):
+        """Insert all pending lines with a single insert and scroll"""
+        self._flush_job = None
+        if not self._pending:
+            return
+
         self.log_text.config(state="normal")
-        self.log_text.insert("end", text + "\n")
+        self.log_text.insert("end", "\n".join(self._pending) + "\n")
+        self._pending.clear()
+
+        # Keep only the most recent MAX_LINES lines so memory and redraw cost stay bounded
+        line_count = int(self.log_text.index("end-1c").split(".")[0])
+        if line_count > self.MAX_LINES:
+            self.log_text.delete("1.0", f"{line_count - self.MAX_LINES}.0")
+
         self.log_text.see("end")  # Auto-scroll to the end
         self.log_text.config(state="disabled")
 
     def clear_display(self):
         """Clear the log text display"""
+        self._pending.clear()
         self.log_text.config(state="normal")
         self.log_text.delete(1.0, "end")
         self.log_text.config(state="disabled")
\ No newline at end of file
@@ -4,11 +4,15 @@ Manages reference images for parking space detection
 """
 
 import os
+from collections import OrderedDict, defaultdict
+
 import cv2
 from tkinter import Label, Button, Frame, Canvas, ttk
 from tkinter import LEFT, RIGHT, X, Y, BOTH
 from PIL import Image, ImageTk
 
+from utils.file_utils import load_image_cached
+
 class ReferenceTab:
     """Reference tab UI class for managing reference images"""
 
@@ -23,6 +27,14 @@ class ReferenceTab:
         self.controller = controller
         self.parent = parent
 
+        # Preview PhotoImages keyed by (path, mtime_ns, height), least recently used first
+        self._thumb_cache = OrderedDict()
+        self._thumb_cache_size = 16
+
+        # Pending debounced after() jobs, so bursts of updates or selections run only once
+        self._populate_after_id = None
+        self._select_after_id = None
+
         # Set up reference tab components
         self._setup_reference_panel()
 
@@ -84,15 +96,26 @@ class ReferenceTab:
         self.ref_tree.bind("<<TreeviewSelect>>", self.on_reference_select)
 
     def populate_reference_tree(self):
+        """Schedule a repopulation of the reference tree, coalescing calls within 100 ms"""
+        if self._populate_after_id is not None:
+            self.parent.after_cancel(self._populate_after_id)
+        self._populate_after_id = self.parent.after(100, self._populate_reference_tree_now)
+
+    def _populate_reference_tree_now(self):
         """Populate the reference image tree with data"""
+        self._populate_after_id = None
+
         # Clear existing items
         for item in self.ref_tree.get_children():
             self.ref_tree.delete(item)
 
+        # Group videos by reference image in a single pass over the map
+        videos_by_ref = defaultdict(list)
+        for vid, img in self.controller.video_reference_map.items():
+            videos_by_ref[img].append(vid)
+
         # Add each reference image
-        for ref_img in set(self.controller.video_reference_map.values()):
-            # Find associated videos
-            associated = [vid for vid, img in self.controller.video_reference_map.items() if img == ref_img]
+        for ref_img, associated in videos_by_ref.items():
             associated_str = ", ".join(associated)
 
             # Get dimensions
@@ -106,7 +129,14 @@ class ReferenceTab:
             self.ref_tree.insert("", "end", values=(ref_img, dimensions_str, associated_str))
 
     def on_reference_select(self, event):
-        """Handle reference image selection"""
+        """Handle reference image selection, previewing only where arrow-key traversal settles"""
+        if self._select_after_id is not None:
+            self.parent.after_cancel(self._select_after_id)
+        self._select_after_id = self.parent.after(100, self._preview_selected_reference)
+
+    def _preview_selected_reference(self):
+        """Show the currently selected reference image in the preview canvas"""
+        self._select_after_id = None
         selection = self.ref_tree.selection()
         if selection:
             item = selection[0]
@@ -115,23 +145,44 @@ class ReferenceTab:
             # Display the image in the preview canvas
             try:
                 if os.path.exists(ref_img):
-                    img = cv2.imread(ref_img)
-                    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-                    # Resize for preview
-                    preview_height = 300
-                    ratio = preview_height / img.shape[0]
-                    preview_width = int(img.shape[1] * ratio)
-
-                    img = cv2.resize(img, (preview_width, preview_height))
-
-                    # Convert to PhotoImage
-                    img_pil = Image.fromarray(img)
-                    img_tk = ImageTk.PhotoImage(image=img_pil)
+                    img_tk = self._get_thumbnail(ref_img, 300)
 
                     # Update canvas
-                    self.preview_canvas.config(width=preview_width, height=preview_height)
+                    self.preview_canvas.config(width=img_tk.width(), height=img_tk.height())
                     self.preview_canvas.create_image(0, 0, anchor="nw", image=img_tk)
                     self.preview_canvas.image = img_tk  # Keep a reference
             except Exception as e:
-                self.controller.log_event(f"Error previewing reference image: {str(e)}")
\ No newline at end of file
+                self.controller.log_event(f"Error previewing reference image: {str(e)}")
+
+    def _get_thumbnail(self, ref_img, preview_height):
+        """
+        Return the preview PhotoImage for a reference image, building it only on a cache miss
+
+        Args:
+            ref_img: Reference image path
+            preview_height: Height of the preview in pixels
+
+        Returns:
+            ImageTk.PhotoImage
+        """
+        key = (ref_img, os.stat(ref_img).st_mtime_ns, preview_height)
+        img_tk = self._thumb_cache.get(key)
+        if img_tk is not None:
+            self._thumb_cache.move_to_end(key)
+            return img_tk
+
+        img = load_image_cached(ref_img)
+
+        # Resize for preview, then convert only the small image to RGB
+        ratio = preview_height / img.shape[0]
+        preview_width = int(img.shape[1] * ratio)
+        img = cv2.resize(img, (preview_width, preview_height), interpolation=cv2.INTER_AREA)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+        # Convert to PhotoImage
+        img_tk = ImageTk.PhotoImage(image=Image.fromarray(img))
+
+        self._thumb_cache[key] = img_tk
+        if len(self._thumb_cache) > self._thumb_cache_size:
+            self._thumb_cache.popitem(last=False)
+        return img_tk
\ No newline at end of file
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class MatPool:
+    """
+    Size-keyed pool of reusable NumPy scratch buffers
+
+    Pass buffers from get() as the dst= argument of OpenCV calls and put() them
+    back once the frame is done, so steady-state processing allocates nothing.
+    """
+
+    def __init__(self):
+        self._pools = {}
+
+    def get(self, shape, dtype=np.uint8):
+        """
+        Lease a buffer of the given shape and dtype (contents are undefined)
+
+        Args:
+            shape: Buffer shape
+            dtype: Buffer dtype
+
+        Returns:
+            np.ndarray
+        """
+        free = self._pools.setdefault((tuple(shape), np.dtype(dtype)), [])
+        return free.pop() if free else np.empty(shape, dtype)
+
+    def put(self, *arrays):
+        """Return leased buffers to the pool"""
+        for arr in arrays:
+            self._pools.setdefault((arr.shape, arr.dtype), []).append(arr)
+
+    def clear(self):
+        """Drop all pooled buffers"""
+        self._pools.clear()
@@ -1,34 +1,127 @@
+import csv
+import io
 import os
 import pickle
+import queue
+import threading
 from datetime import datetime
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+# Saves are serialized on the caller's thread and written by a single daemon thread,
+# so Tk event handlers never block on disk I/O
+_write_q = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+
+def _writer_loop():
+    """Write queued (path, data, on_done, on_error) jobs in submission order"""
+    while True:
+        path, data, on_done, on_error = _write_q.get()
+        try:
+            # Write next to the target and swap it in, so a crash never leaves a truncated file
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            if on_done:
+                on_done()
+        except Exception as e:
+            if on_error:
+                on_error(e)
+        finally:
+            _write_q.task_done()
+
+
+def _submit_write(path, data, on_done=None, on_error=None):
+    """Queue bytes to be written to path by the writer thread, starting it on first use"""
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, name="file-writer", daemon=True)
+            _writer_thread.start()
+    _write_q.put((path, data, on_done, on_error))
+
+
+def flush_writes():
+    """Block until every queued save has been written"""
+    _write_q.join()
 
 
 def ensure_directories_exist(directories):
     """Ensure necessary directories exist"""
     for directory in directories:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
+
+
+@lru_cache(maxsize=4)
+def _decode_image(path, mtime_ns):
+    """Decode an image file; mtime_ns is only part of the cache key"""
+    # imdecode on the raw bytes also handles non-ASCII paths that imread rejects on Windows
+    return cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def load_image_cached(path):
+    """
+    Load a BGR image, reusing the decoded array until the file is modified
+
+    The returned array is shared with the cache and must not be modified in place.
+
+    Args:
+        path: Image file path
+
+    Returns:
+        np.ndarray, or None if the file is missing or cannot be decoded
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return _decode_image(path, mtime_ns)
+
+
+class _PositionsUnpickler(pickle.Unpickler):
+    """Unpickler for legacy position files, which only hold lists/tuples of ints"""
+
+    def find_class(self, module, name):
+        # Refuse every global so a crafted file cannot run code on load
+        raise pickle.UnpicklingError(f"Unexpected object {module}.{name} in position file")
+
+
+def _positions_file(config_dir, current_reference_image):
+    """Path of the (N, 4) int32 .npy position file for a reference image"""
+    return os.path.join(config_dir, f'CarParkPos_{os.path.splitext(current_reference_image)[0]}.npy')
 
 
 def load_parking_positions(config_dir, current_reference_image, log_event_callback=None):
-    """Load parking positions from file"""
+    """Load parking positions from file, migrating legacy pickle files to .npy"""
     try:
-        pos_file = os.path.join(config_dir, f'CarParkPos_{os.path.splitext(current_reference_image)[0]}')
+        npy_file = _positions_file(config_dir, current_reference_image)
+        pos_file = os.path.splitext(npy_file)[0]  # Legacy pickle file
 
-        if not os.path.exists(config_dir):
-            raise FileNotFoundError(f"Config directory {config_dir} does not exist")
+        # A save for this reference may still be queued
+        flush_writes()
 
-        if os.path.exists(pos_file):
+        # Open directly instead of checking existence first: one syscall, and no race with the file changing
+        try:
+            return np.load(npy_file).tolist()
+        except FileNotFoundError:
+            pass
+
+        try:
             with open(pos_file, 'rb') as f:
-                positions = pickle.load(f)
-            return positions
-        else:
-            return []
+                positions = _PositionsUnpickler(f).load()
+        except FileNotFoundError:
+            return []  # No spaces defined for this reference yet
+
+        # Re-save as .npy so later loads skip unpickling
+        np.save(npy_file, np.asarray(positions, dtype=np.int32).reshape(-1, 4))
+        return positions
 
-    except FileNotFoundError as e:
-        if log_event_callback:
-            log_event_callback(f"Position file not found: {str(e)}")
-        return []
     except PermissionError as e:
         if log_event_callback:
             log_event_callback(f"Permission denied: {str(e)}")
@@ -40,15 +133,22 @@ def load_parking_positions(config_dir, current_reference_image, log_event_callba
 
 
 def save_parking_positions(config_dir, current_reference_image, positions, log_event_callback=None):
-    """Save parking positions to file"""
+    """Queue parking positions to be saved to file; returns once they are serialized"""
     try:
-        pos_file = os.path.join(config_dir, f'CarParkPos_{os.path.splitext(current_reference_image)[0]}')
-        with open(pos_file, 'wb') as f:
-            pickle.dump(positions, f)
+        pos_file = _positions_file(config_dir, current_reference_image)
+        buf = io.BytesIO()
+        np.save(buf, np.asarray(positions, dtype=np.int32).reshape(-1, 4))
+        count = len(positions)
 
-        if log_event_callback:
-            log_event_callback(f"Saved {len(positions)} parking spaces for {current_reference_image}")
+        def on_done():
+            if log_event_callback:
+                log_event_callback(f"Saved {count} parking spaces for {current_reference_image}")
+
+        def on_error(e):
+            if log_event_callback:
+                log_event_callback(f"Failed to save parking spaces: {str(e)}")
 
+        _submit_write(pos_file, buf.getvalue(), on_done, on_error)
         return True
     except Exception as e:
         if log_event_callback:
@@ -57,18 +157,23 @@ def save_parking_positions(config_dir, current_reference_image, positions, log_e
 
 
 def save_log(log_dir, log_data, log_event_callback=None):
-    """Save log data to a file"""
+    """Queue log data to be saved to a file; returns the file name it will be written to"""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = os.path.join(log_dir, f"parking_log_{timestamp}.txt")
 
-        with open(filename, 'w') as f:
-            for entry in log_data:
-                f.write(entry + "\n")
+        # Build the whole file once; the writer thread writes it in a single call
+        data = "".join(entry + "\n" for entry in log_data).encode()
 
-        if log_event_callback:
-            log_event_callback(f"Log saved to {filename}")
+        def on_done():
+            if log_event_callback:
+                log_event_callback(f"Log saved to {filename}")
+
+        def on_error(e):
+            if log_event_callback:
+                log_event_callback(f"Failed to save log: {str(e)}")
 
+        _submit_write(filename, data, on_done, on_error)
         return filename
     except Exception as e:
         if log_event_callback:
@@ -77,19 +182,27 @@ def save_log(log_dir, log_data, log_event_callback=None):
 
 
 def export_statistics(log_dir, stats_data, log_event_callback=None):
-    """Export statistics to CSV file"""
+    """Queue statistics to be exported to a CSV file; returns the file name it will be written to"""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = os.path.join(log_dir, f"parking_stats_{timestamp}.csv")
 
-        with open(filename, 'w') as f:
-            f.write("Timestamp,Total Spaces,Free Spaces,Occupied Spaces,Vehicles Counted\n")
-            for row in stats_data:
-                f.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]}\n")
+        # csv formats all rows in C and quotes any value containing a comma
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(["Timestamp", "Total Spaces", "Free Spaces", "Occupied Spaces", "Vehicles Counted"])
+        writer.writerows(stats_data)
+        data = buf.getvalue().encode()
 
-        if log_event_callback:
-            log_event_callback(f"Statistics exported to {filename}")
+        def on_done():
+            if log_event_callback:
+                log_event_callback(f"Statistics exported to {filename}")
+
+        def on_error(e):
+            if log_event_callback:
+                log_event_callback(f"Failed to export statistics: {str(e)}")
 
+        _submit_write(filename, data, on_done, on_error)
         return filename
     except Exception as e:
         if log_event_callback:
@@ -1,7 +1,121 @@
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+from functools import lru_cache
+import logging
+import math
+import subprocess
+
 import cv2
-import torch
 import numpy as np
 
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+logger = logging.getLogger(__name__)
+
+# Free GpuMats keyed by (rows, cols, type), reused across calls instead of reallocating per frame.
+# Shared by all threads (list pop/append are atomic) so buffers warmed on the UI thread serve the
+# worker; least recently used sizes are dropped so a resolution change frees the old buffers.
+_GPU_POOL = OrderedDict()
+_GPU_POOL_MAX_SIZES = 8
+
+# Page-locked host staging buffers, pooled the same way; entries are (HostMem, ndarray view)
+_HOST_POOL = OrderedDict()
+
+# Host/device shared buffers for unified-memory GPUs; entries are (HostMem, ndarray view, GpuMat header)
+_SHARED_POOL = OrderedDict()
+
+# (torch_gpu_available, cv_gpu_available), probed once per process by get_gpu_state()
+_GPU_STATE = None
+
+# PyTorch device details shared by report_gpu() and diagnose_gpu(), filled by _probe_torch()
+_torch_probe = None
+
+# Many OpenCV CUDA builds lack some ops; check once instead of failing after the upload on every call
+# No OpenCV build ships cv2.cuda.adaptiveThreshold; it is emulated with the cudafilters module
+_HAS_CUDA_FILTERS = hasattr(cv2, 'cuda') and hasattr(cv2.cuda, 'createGaussianFilter')
+_HAS_CUDA_RESIZE = hasattr(cv2, 'cuda') and hasattr(cv2.cuda, 'resize')
+
+# Below this input size the PCIe round trip costs more than the CPU op, so small images stay on the CPU
+_GPU_MIN_BYTES = 512 * 1024
+
+
+def _probe_gpu():
+    """Query PyTorch and OpenCV for CUDA support without reporting anything"""
+    # torch is imported here rather than at module level so CPU-only users of this module never load it
+    try:
+        import torch
+        torch_gpu_available = torch.cuda.is_available()
+    except ImportError:
+        torch_gpu_available = False
+    return torch_gpu_available, get_cv_gpu_state()
+
+
+@lru_cache(maxsize=1)
+def get_cv_gpu_state():
+    """
+    Return whether OpenCV can use a CUDA device, probing once and without importing PyTorch
+
+    Returns:
+        bool: cv_gpu_available
+    """
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (cv2.error, AttributeError):  # No CUDA support compiled in
+        return False
+
+
+def get_gpu_state():
+    """
+    Return the cached GPU availability, probing on the first call only
+
+    Returns:
+        tuple: (torch_gpu_available, cv_gpu_available)
+    """
+    global _GPU_STATE
+    if _GPU_STATE is None:
+        _GPU_STATE = _probe_gpu()
+    return _GPU_STATE
+
+
+@lru_cache(maxsize=8)
+def _dev_props(index):
+    """torch.cuda.get_device_properties(index), which cannot change while the process runs"""
+    import torch
+    return torch.cuda.get_device_properties(index)
+
+
+@lru_cache(maxsize=1)
+def _device_count():
+    """Cached torch.cuda.device_count()"""
+    import torch
+    return torch.cuda.device_count()
+
+
+def _probe_torch():
+    """
+    Collect the static PyTorch CUDA details once per process
+
+    Returns:
+        dict: available, cuda_version, and name, count and total_memory_gb when available
+    """
+    global _torch_probe
+    if _torch_probe is None:
+        try:
+            import torch
+            cuda_version = getattr(torch.version, 'cuda', None)
+        except ImportError:
+            cuda_version = None
+        probe = {"available": get_gpu_state()[0], "cuda_version": cuda_version}
+        if probe["available"]:
+            probe["name"] = _dev_props(0).name
+            probe["count"] = _device_count()
+            probe["total_memory_gb"] = _dev_props(0).total_memory / (1024 ** 3)
+        _torch_probe = probe
+    return _torch_probe
+
 
 def check_gpu_availability():
     """
@@ -10,32 +124,168 @@ def check_gpu_availability():
     Returns:
         tuple: (torch_gpu_available, cv_gpu_available)
     """
+    state = get_gpu_state()
+    report_gpu()
+    return state
+
+
+def report_gpu():
+    """Log the GPU availability found by get_gpu_state() at INFO level"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    cv_gpu_available = get_gpu_state()[1]
+    probe = _probe_torch()
+
     # Check PyTorch GPU
-    torch_gpu_available = torch.cuda.is_available()
-    if torch_gpu_available:
-        gpu_name = torch.cuda.get_device_name(0)
-        gpu_count = torch.cuda.device_count()
-        gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)  # Convert to GB
-        print(f"PyTorch GPU available: {gpu_name} (Count: {gpu_count}, Memory: {gpu_mem:.2f}GB)")
+    if probe["available"]:
+        logger.info("PyTorch GPU available: %s (Count: %d, Memory: %.2fGB)",
+                    probe['name'], probe['count'], probe['total_memory_gb'])
     else:
-        print("PyTorch GPU not available, using CPU")
+        logger.info("PyTorch GPU not available, using CPU")
 
     # Check OpenCV GPU (CUDA)
-    cv_gpu_available = False
+    if cv_gpu_available:
+        logger.info("OpenCV CUDA enabled devices: %d", cv2.cuda.getCudaEnabledDeviceCount())
+    else:
+        logger.info("OpenCV CUDA not available")
+
+
+def enable_opencl():
+    """
+    Turn on OpenCV's OpenCL (T-API) dispatch for cv2.UMat once at startup
+
+    Returns:
+        bool: Whether OpenCL is available and in use
+    """
+    if not cv2.ocl.haveOpenCL():
+        logger.info("OpenCL not available, UMat operations run on the CPU")
+        return False
+    cv2.ocl.setUseOpenCL(True)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("OpenCL enabled: %s", cv2.ocl.Device.getDefault().name())
+    return cv2.ocl.useOpenCL()
+
+
+@contextmanager
+def leased_gpu_mat(rows, cols, mat_type):
+    """
+    Lease a GpuMat from the pool for the duration of a with block
+
+    Args:
+        rows: Number of rows
+        cols: Number of columns
+        mat_type: OpenCV type (e.g., cv2.CV_8UC1)
+
+    Yields:
+        cv2.cuda_GpuMat of the requested size and type
+    """
+    with _lease(_GPU_POOL, (rows, cols, mat_type), lambda: cv2.cuda_GpuMat(rows, cols, mat_type)) as mat:
+        yield mat
+
+
+@contextmanager
+def leased_host_mem(rows, cols, mat_type):
+    """
+    Lease a page-locked host buffer from the pool for the duration of a with block
+
+    Uploads from and downloads into pinned memory go straight over DMA instead of being
+    staged by the driver through its own pinned buffer.
+
+    Args:
+        rows: Number of rows
+        cols: Number of columns
+        mat_type: OpenCV type (e.g., cv2.CV_8UC1)
+
+    Yields:
+        np.ndarray view of the pinned buffer (contents are undefined)
+    """
+    def alloc():
+        # The view does not own the memory, so the HostMem is pooled alongside it
+        host_mem = cv2.cuda.HostMem(rows, cols, mat_type, cv2.cuda.HostMem_PAGE_LOCKED)
+        return host_mem, host_mem.createMatHeader()
+
+    with _lease(_HOST_POOL, (rows, cols, mat_type), alloc) as (_, view):
+        yield view
+
+
+@contextmanager
+def leased_shared_mem(rows, cols, mat_type):
+    """
+    Lease a buffer mapped into both host and device address spaces (unified-memory GPUs only)
+
+    Args:
+        rows: Number of rows
+        cols: Number of columns
+        mat_type: OpenCV type (e.g., cv2.CV_8UC1)
+
+    Yields:
+        tuple: (np.ndarray host view, cv2.cuda_GpuMat device header) over the same memory
+    """
+    def alloc():
+        host_mem = cv2.cuda.HostMem(rows, cols, mat_type, cv2.cuda.HostMem_SHARED)
+        return host_mem, host_mem.createMatHeader(), host_mem.createGpuMatHeader()
+
+    with _lease(_SHARED_POOL, (rows, cols, mat_type), alloc) as (_, view, gpu_mat):
+        yield view, gpu_mat
+
+
+@lru_cache(maxsize=1)
+def _is_unified_memory():
+    """Whether the CUDA device is an integrated GPU (e.g. Jetson) that can map host memory"""
     try:
-        cv_gpu_count = cv2.cuda.getCudaEnabledDeviceCount()
-        if cv_gpu_count > 0:
-            cv_gpu_available = True
-            print(f"OpenCV CUDA enabled devices: {cv_gpu_count}")
-        else:
-            print("OpenCV CUDA not available")
-    except:
-        print("OpenCV CUDA support not compiled")
+        info = cv2.cuda.DeviceInfo(cv2.cuda.getDevice())
+        return bool(info.integrated() and info.canMapHostMemory())
+    except (cv2.error, AttributeError):
+        return False
 
-    return torch_gpu_available, cv_gpu_available
+
+@contextmanager
+def _lease(pool, key, alloc):
+    """Lease a free item for key from an LRU pool, allocating one if there is none"""
+    free = pool.get(key)
+    if free is None:
+        free = pool[key] = []
+        while len(pool) > _GPU_POOL_MAX_SIZES:
+            pool.popitem(last=False)
+    else:
+        try:
+            pool.move_to_end(key)
+        except KeyError:
+            pass  # Evicted by another thread in the meantime; this lease still uses its list
+    try:
+        item = free.pop()
+    except IndexError:
+        item = alloc()
+    try:
+        yield item
+    finally:
+        free.append(item)
 
 
-def gpu_adaptive_threshold(img, max_value, adaptive_method, threshold_type, block_size, c, cv_gpu_available=False):
+def warm_gpu_pool(size, cv_gpu_available=False):
+    """
+    Preallocate the GpuMats and pinned host buffers used to process frames of the given size
+
+    Args:
+        size: Frame size (width, height)
+        cv_gpu_available: Whether OpenCV GPU is available
+    """
+    if not cv_gpu_available:
+        return
+    width, height = size
+    for mat_type in (cv2.CV_8UC1, cv2.CV_8UC3):
+        with leased_gpu_mat(height, width, mat_type), leased_host_mem(height, width, mat_type):
+            pass
+
+
+def _mat_type(img):
+    """OpenCV type of an 8-bit image with 1-4 channels"""
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    return cv2.CV_8UC(channels)
+
+
+def gpu_adaptive_threshold(img, max_value, adaptive_method, threshold_type, block_size, c, cv_gpu_available=None,
+                           copy=True):
     """
     GPU-accelerated adaptive threshold if available
 
@@ -46,104 +296,378 @@ def gpu_adaptive_threshold(img, max_value, adaptive_method, threshold_type, bloc
         threshold_type: Threshold type (e.g., cv2.THRESH_BINARY_INV)
         block_size: Block size for adaptive threshold
         c: Constant subtracted from mean
-        cv_gpu_available: Whether OpenCV GPU is available
+        cv_gpu_available: Whether OpenCV GPU is available; None uses the cached probe
+        copy: If False, a cv2.cuda result is returned as a view of the pooled pinned buffer it
+            was downloaded into, valid only until the next call with the same image size
 
     Returns:
         Result image
     """
-    if cv_gpu_available:
+    if cv_gpu_available is None:
+        cv_gpu_available = get_gpu_state()[1]
+    if cv_gpu_available and _HAS_CUDA_FILTERS and img.ndim == 2 and img.nbytes >= _GPU_MIN_BYTES:
         try:
-            # Upload to GPU
-            gpu_img = cv2.cuda_GpuMat()
-            gpu_img.upload(img)
-
-            # Process on GPU
-            gpu_result = cv2.cuda.adaptiveThreshold(
-                gpu_img, max_value, adaptive_method, threshold_type, block_size, c)
+            return _gpu_single(
+                img, (img.shape[0], img.shape[1], cv2.CV_8UC1),
+                _cuda_adaptive_threshold(max_value, adaptive_method, threshold_type, block_size, c), copy)
+        except (cv2.error, AttributeError, RuntimeError) as e:
+            logger.warning("GPU threshold error: %s, falling back to CPU", e)
 
-            # Download result
-            result = gpu_result.download()
-            return result
-        except Exception as e:
-            print(f"GPU threshold error: {e}, falling back to CPU")
+    # Without the OpenCV CUDA modules, PyTorch can still do it on the GPU
+    elif get_gpu_state()[0] and img.ndim == 2 and img.nbytes >= _GPU_MIN_BYTES:
+        try:
+            return _torch_adaptive_threshold(img, max_value, adaptive_method, threshold_type, block_size, c)
+        except RuntimeError as e:
+            logger.warning("Torch threshold error: %s, falling back to CPU", e)
 
-    # CPU fallback
+    # CPU fallback, through the T-API when OpenCL is enabled
+    if cv2.ocl.useOpenCL():
+        return cv2.adaptiveThreshold(
+            cv2.UMat(img), max_value, adaptive_method, threshold_type, block_size, c).get()
     return cv2.adaptiveThreshold(img, max_value, adaptive_method, threshold_type, block_size, c)
 
 
-def gpu_resize(img, size, cv_gpu_available=False):
+@lru_cache(maxsize=8)
+def _cuda_mean_filter(adaptive_method, block_size):
+    """CUDA filter computing cv2.adaptiveThreshold's local mean, with its BORDER_REPLICATE padding"""
+    if adaptive_method == cv2.ADAPTIVE_THRESH_MEAN_C:
+        return cv2.cuda.createBoxFilter(cv2.CV_8UC1, cv2.CV_8UC1, (block_size, block_size),
+                                        borderMode=cv2.BORDER_REPLICATE)
+    return cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (block_size, block_size), 0,
+                                         rowBorderMode=cv2.BORDER_REPLICATE,
+                                         columnBorderMode=cv2.BORDER_REPLICATE)
+
+
+def _cuda_adaptive_threshold(max_value, adaptive_method, threshold_type, block_size, c):
+    """
+    Launch function emulating cv2.adaptiveThreshold with cv2.cuda filters, for _gpu_single/_gpu_batch
+
+    The mean is written into dst, and the difference to the source then overwrites it in place,
+    so no scratch GpuMat is needed. Saturating uint8 subtraction loses the sign, so the direction
+    of the subtraction is chosen such that the comparison with OpenCV's rounded c survives it.
+    """
+    mean_filter = _cuda_mean_filter(adaptive_method, block_size)
+    max_value = min(255, max(0, int(round(max_value))))
+    if threshold_type == cv2.THRESH_BINARY:
+        # Keep where src - mean > -ceil(c), i.e. mean - src < ceil(c)
+        k = math.ceil(c)
+        mean_minus_src, thresh, op = (True, k - 1, cv2.THRESH_BINARY_INV) if k >= 1 else \
+            (False, -k, cv2.THRESH_BINARY)
+    else:
+        # Keep where src - mean <= -floor(c), i.e. mean - src >= floor(c)
+        k = math.floor(c)
+        mean_minus_src, thresh, op = (True, k - 1, cv2.THRESH_BINARY) if k >= 1 else \
+            (False, -k, cv2.THRESH_BINARY_INV)
+
+    def launch(src, dst, stream):
+        mean_filter.apply(src, dst, stream)
+        if mean_minus_src:
+            cv2.cuda.subtract(dst, src, dst, stream=stream)
+        else:
+            cv2.cuda.subtract(src, dst, dst, stream=stream)
+        cv2.cuda.threshold(dst, thresh, max_value, op, dst, stream)
+    return launch
+
+
+@lru_cache(maxsize=8)
+def _gaussian_kernel(block_size, device):
+    """1-D Gaussian weights cv2.adaptiveThreshold uses for a block size, as a float32 tensor"""
+    import torch
+    return torch.from_numpy(cv2.getGaussianKernel(block_size, 0).astype(np.float32).ravel()).to(device)
+
+
+def _torch_adaptive_threshold(img, max_value, adaptive_method, threshold_type, block_size, c):
+    """
+    cv2.adaptiveThreshold for a single-channel uint8 image, computed with PyTorch on the GPU
+
+    Follows OpenCV: the local mean uses replicated borders and is rounded to uint8, and the
+    comparison uses the same integer rounding of c (Gaussian means may differ by one level
+    where OpenCV's fixed-point blur rounds differently).
+    """
+    import torch
+    import torch.nn.functional as F
+
+    device = torch.device('cuda')
+    rows, cols = img.shape[:2]
+    alloc = lambda: torch.empty((rows, cols), dtype=torch.uint8, pin_memory=True)
+    # The async upload reads the pinned buffer, so it stays leased until the blocking download at the end
+    with _lease(_HOST_POOL, ('torch', rows, cols), alloc) as host:
+        np.copyto(host.numpy(), img)
+        x = host.to(device, non_blocking=True).float()[None, None]
+        pad = block_size // 2
+        padded = F.pad(x, (pad, pad, pad, pad), mode='replicate')
+
+        if adaptive_method == cv2.ADAPTIVE_THRESH_MEAN_C:
+            mean = F.avg_pool2d(padded, block_size, stride=1)
+        else:
+            # Separable Gaussian: one vertical and one horizontal pass
+            kernel = _gaussian_kernel(block_size, device)
+            mean = F.conv2d(F.conv2d(padded, kernel.view(1, 1, -1, 1)), kernel.view(1, 1, 1, -1))
+
+        diff = x - mean.round()
+        if threshold_type == cv2.THRESH_BINARY:
+            mask = diff > -math.ceil(c)
+        else:
+            mask = diff <= -math.floor(c)
+
+        out = mask.to(torch.uint8) * min(255, max(0, int(round(max_value))))
+        return out[0, 0].cpu().numpy()
+
+
+def gpu_resize(img, size, cv_gpu_available=None, copy=True):
     """
     GPU-accelerated resize if available
 
     Args:
         img: Input image
         size: Target size (width, height)
-        cv_gpu_available: Whether OpenCV GPU is available
+        cv_gpu_available: Whether OpenCV GPU is available; None uses the cached probe
+        copy: If False, a GPU result is returned as a view of the pooled pinned buffer it was
+            downloaded into, valid only until the next call with the same size
 
     Returns:
         Resized image
     """
-    if cv_gpu_available:
+    if cv_gpu_available is None:
+        cv_gpu_available = get_gpu_state()[1]
+    if cv_gpu_available and _HAS_CUDA_RESIZE and img.nbytes >= _GPU_MIN_BYTES:
         try:
-            gpu_img = cv2.cuda_GpuMat()
-            gpu_img.upload(img)
-            gpu_resized = cv2.cuda.resize(gpu_img, size)
-            return gpu_resized.download()
-        except Exception as e:
-            print(f"GPU resize error: {e}, falling back to CPU")
+            return _gpu_single(
+                img, (size[1], size[0], _mat_type(img)),
+                lambda src, dst, stream: cv2.cuda.resize(src, size, dst=dst, stream=stream), copy)
+        except (cv2.error, AttributeError, RuntimeError) as e:
+            logger.warning("GPU resize error: %s, falling back to CPU", e)
 
     return cv2.resize(img, size)
 
 
-def diagnose_gpu():
-    """Run comprehensive GPU diagnostics and return results as a string"""
+@lru_cache(maxsize=1)
+def _stream():
+    """Module-wide non-default CUDA stream for single-image calls, created on first use"""
+    return cv2.cuda_Stream()
+
+
+def _gpu_single(img, out_dims, launch, copy=True):
+    """
+    Run one operation on the GPU and wait for it
+
+    Discrete GPUs go through pinned staging buffers. On unified-memory GPUs the input is
+    written straight into memory the device can read, so there is no upload or download.
+
+    Args:
+        img: Input image
+        out_dims: (rows, cols, type) of the output
+        launch: Called as launch(gpu_src, gpu_dst, stream) to enqueue the operation
+        copy: If False, return a view of the pooled output buffer
+
+    Returns:
+        Result image
+    """
+    rows, cols, out_type = out_dims
+    in_type = _mat_type(img)
+    stream = _stream()
+
+    if _is_unified_memory():
+        with leased_shared_mem(img.shape[0], img.shape[1], in_type) as (host_in, gpu_img), \
+                leased_shared_mem(rows, cols, out_type) as (host_out, gpu_out):
+            np.copyto(host_in, img.reshape(host_in.shape))
+            launch(gpu_img, gpu_out, stream)
+            stream.waitForCompletion()
+            return host_out.copy() if copy else host_out
+
+    with leased_gpu_mat(img.shape[0], img.shape[1], in_type) as gpu_img, \
+            leased_gpu_mat(rows, cols, out_type) as gpu_out, \
+            leased_host_mem(img.shape[0], img.shape[1], in_type) as host_in, \
+            leased_host_mem(rows, cols, out_type) as host_out:
+        # Upload through pinned memory, run, and download into pinned memory; unless asked
+        # not to, hand back an array the pool doesn't own
+        np.copyto(host_in, img.reshape(host_in.shape))
+        _enqueue(host_in, host_out, gpu_img, gpu_out, launch, stream)
+        stream.waitForCompletion()
+        return host_out.copy() if copy else host_out
+
+
+def _gpu_batch(imgs, out_dims, launch, copy=True):
+    """
+    Pipeline a batch of images through the GPU on one stream, synchronizing once at the end
+
+    Every image gets its own leased buffers, so the host-side copy of image k+1 and its
+    upload overlap the kernel of image k and the download of image k-1.
+
+    Args:
+        imgs: Input images
+        out_dims: (rows, cols, type) of each output
+        launch: Called as launch(gpu_src, gpu_dst, stream) to enqueue the operation
+        copy: If False, return views of the pooled pinned output buffers
+
+    Returns:
+        list of result images
+    """
+    stream = cv2.cuda_Stream()
+    unified = _is_unified_memory()
+    with ExitStack() as stack:
+        outputs = []
+        for img, (rows, cols, out_type) in zip(imgs, out_dims):
+            in_type = _mat_type(img)
+            if unified:
+                # Shared buffers: the kernel reads and writes host memory directly
+                host_in, gpu_img = stack.enter_context(leased_shared_mem(img.shape[0], img.shape[1], in_type))
+                host_out, gpu_out = stack.enter_context(leased_shared_mem(rows, cols, out_type))
+                np.copyto(host_in, img.reshape(host_in.shape))
+                launch(gpu_img, gpu_out, stream)
+                outputs.append(host_out)
+                continue
+
+            gpu_img = stack.enter_context(leased_gpu_mat(img.shape[0], img.shape[1], in_type))
+            gpu_out = stack.enter_context(leased_gpu_mat(rows, cols, out_type))
+            host_in = stack.enter_context(leased_host_mem(img.shape[0], img.shape[1], in_type))
+            host_out = stack.enter_context(leased_host_mem(rows, cols, out_type))
+
+            np.copyto(host_in, img.reshape(host_in.shape))
+            _enqueue(host_in, host_out, gpu_img, gpu_out, launch, stream)
+            outputs.append(host_out)
+
+        stream.waitForCompletion()
+        return [out.copy() for out in outputs] if copy else outputs
+
+
+def _enqueue(host_in, host_out, gpu_src, gpu_dst, launch, stream):
+    """Enqueue upload, launch(gpu_src, gpu_dst, stream) and download on stream without waiting"""
+    gpu_src.upload(host_in, stream)
+    launch(gpu_src, gpu_dst, stream)
+    gpu_dst.download(stream, host_out)
+
+
+def gpu_adaptive_threshold_batch(imgs, max_value, adaptive_method, threshold_type, block_size, c,
+                                 cv_gpu_available=None, copy=True):
+    """
+    Adaptive threshold of several images with a single GPU synchronization
+
+    Args:
+        imgs: Input grayscale images
+        max_value: Maximum value for threshold
+        adaptive_method: Adaptive method (e.g., cv2.ADAPTIVE_THRESH_GAUSSIAN_C)
+        threshold_type: Threshold type (e.g., cv2.THRESH_BINARY_INV)
+        block_size: Block size for adaptive threshold
+        c: Constant subtracted from mean
+        cv_gpu_available: Whether OpenCV GPU is available; None uses the cached probe
+        copy: If False, GPU results are views of pooled pinned buffers (see gpu_adaptive_threshold)
+
+    Returns:
+        list of result images
+    """
+    if cv_gpu_available is None:
+        cv_gpu_available = get_gpu_state()[1]
+    # One synchronization covers the whole batch, so it is the batch size that has to pay for it
+    if cv_gpu_available and _HAS_CUDA_FILTERS and all(img.ndim == 2 for img in imgs) and \
+            sum(img.nbytes for img in imgs) >= _GPU_MIN_BYTES:
+        try:
+            return _gpu_batch(
+                imgs, [(img.shape[0], img.shape[1], cv2.CV_8UC1) for img in imgs],
+                _cuda_adaptive_threshold(max_value, adaptive_method, threshold_type, block_size, c), copy)
+        except (cv2.error, AttributeError, RuntimeError) as e:
+            logger.warning("GPU batch threshold error: %s, falling back to CPU", e)
+
+    return [gpu_adaptive_threshold(img, max_value, adaptive_method, threshold_type, block_size, c, False)
+            for img in imgs]
+
+
+def gpu_resize_batch(imgs, size, cv_gpu_available=None, copy=True):
+    """
+    Resize several images with a single GPU synchronization
+
+    Args:
+        imgs: Input images
+        size: Target size (width, height)
+        cv_gpu_available: Whether OpenCV GPU is available; None uses the cached probe
+        copy: If False, GPU results are views of pooled pinned buffers (see gpu_resize)
+
+    Returns:
+        list of resized images
+    """
+    if cv_gpu_available is None:
+        cv_gpu_available = get_gpu_state()[1]
+    if cv_gpu_available and _HAS_CUDA_RESIZE and sum(img.nbytes for img in imgs) >= _GPU_MIN_BYTES:
+        try:
+            return _gpu_batch(
+                imgs, [(size[1], size[0], _mat_type(img)) for img in imgs],
+                lambda src, dst, stream: cv2.cuda.resize(src, size, dst=dst, stream=stream), copy)
+        except (cv2.error, AttributeError, RuntimeError) as e:
+            logger.warning("GPU batch resize error: %s, falling back to CPU", e)
+
+    return [cv2.resize(img, size) for img in imgs]
+
+
+def _nvidia_gpu_present():
+    """Ask the NVIDIA driver whether it sees any GPU, in-process through NVML when pynvml is installed"""
+    if pynvml is not None:
+        try:
+            pynvml.nvmlInit()
+            try:
+                return pynvml.nvmlDeviceGetCount() > 0
+            finally:
+                pynvml.nvmlShutdown()
+        except pynvml.NVMLError:
+            return False
+
+    try:
+        result = subprocess.run(["nvidia-smi", "-L"], capture_output=True, timeout=1.0)
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def diagnose_gpu(force=False):
+    """
+    Run comprehensive GPU diagnostics and return results as a string
+
+    Args:
+        force: Also allocate a test tensor on the GPU, which creates the CUDA context if
+            nothing has yet (hundreds of ms)
+    """
     results = []
 
     try:
         # Check PyTorch GPU availability
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            gpu_count = torch.cuda.device_count()
-            cuda_version = torch.version.cuda
-
+        probe = _probe_torch()
+        if probe["available"]:
+            import torch
             results.append(f"PyTorch CUDA available: Yes")
-            results.append(f"CUDA Version: {cuda_version}")
-            results.append(f"GPU Device: {gpu_name}")
-            results.append(f"GPU Count: {gpu_count}")
+            results.append(f"CUDA Version: {probe['cuda_version']}")
+            results.append(f"GPU Device: {probe['name']}")
+            results.append(f"GPU Count: {probe['count']}")
             results.append(f"Current GPU Device: {torch.cuda.current_device()}")
 
             # Test GPU memory
             try:
                 allocated = torch.cuda.memory_allocated() / (1024 ** 2)
                 max_allocated = torch.cuda.max_memory_allocated() / (1024 ** 2)
-                total = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
 
                 results.append(f"GPU Memory: Currently Allocated: {allocated:.2f}MB")
                 results.append(f"GPU Memory: Max Allocated: {max_allocated:.2f}MB")
-                results.append(f"GPU Memory: Total: {total:.2f}GB")
+                results.append(f"GPU Memory: Total: {probe['total_memory_gb']:.2f}GB")
 
                 # Test simple GPU operation
-                try:
-                    test_tensor = torch.tensor([1., 2., 3.], device='cuda')
-                    results.append(f"GPU Test: Created test tensor on GPU: {test_tensor.device}")
-                except Exception as e:
-                    results.append(f"GPU Test Failed: {str(e)}")
+                if force:
+                    try:
+                        test_tensor = torch.tensor([1., 2., 3.], device='cuda')
+                        results.append(f"GPU Test: Created test tensor on GPU: {test_tensor.device}")
+                    except Exception as e:
+                        results.append(f"GPU Test Failed: {str(e)}")
 
             except Exception as e:
                 results.append(f"GPU Memory Check Failed: {str(e)}")
 
         else:
             results.append("PyTorch CUDA not available")
-            if hasattr(torch, 'version') and hasattr(torch.version, 'cuda'):
-                results.append(f"PyTorch was built with CUDA: {torch.version.cuda}")
+            if probe["cuda_version"] is not None:
+                results.append(f"PyTorch was built with CUDA: {probe['cuda_version']}")
 
             # Check if CUDA is installed but not being found
-            import subprocess
-            try:
-                nvidia_smi = subprocess.check_output("nvidia-smi", shell=True)
+            if _nvidia_gpu_present():
                 results.append("NVIDIA GPU detected by system but not by PyTorch!")
                 results.append("This indicates a PyTorch/CUDA version mismatch")
-            except:
+            else:
                 results.append("NVIDIA driver tools (nvidia-smi) not found")
 
     except Exception as e: